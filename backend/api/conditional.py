@@ -0,0 +1,64 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from recipes.cache import get_data_versions, get_user_state_version_name
+
+
+def data_version_condition(*names, per_user=False):
+    """
+    Условный GET для методов вьюсета по версиям данных из кэша.
+    На совпавший ETag отвечает 304 без запросов к самим данным
+    и без сериализации. Для ответов, зависящих от пользователя,
+    учитывается версия его избранного, корзины и подписок.
+    Вместо имени версии можно передать функцию от запроса,
+    возвращающую имя или None.
+    """
+    def get_versions(request):
+        version_names = [
+            name(request) if callable(name) else name for name in names
+        ]
+        version_names = [name for name in version_names if name]
+        if per_user and request.user.is_authenticated:
+            version_names.append(
+                get_user_state_version_name(request.user.pk)
+            )
+        return get_data_versions(*version_names)
+
+    def get_etag(request, *args, **kwargs):
+        user_id = request.user.pk if per_user else None
+        key = (
+            f'{getattr(request, "accepted_media_type", "")}:'
+            f'{user_id}:{request.data_versions}'
+        )
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def get_last_modified(request, *args, **kwargs):
+        return datetime.fromtimestamp(
+            max(request.data_versions), tz=timezone.utc
+        )
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=get_etag, last_modified_func=get_last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # Версии читаются из кэша один раз для ETag и Last-Modified.
+            request.data_versions = get_versions(request)
+            response = conditional_view(request, *args, **kwargs)
+            # Клиент должен перепроверять ответ при каждом запросе.
+            patch_cache_control(response, no_cache=True)
+            if per_user:
+                patch_cache_control(response, private=True)
+                patch_vary_headers(response, ('Authorization',))
+            return response
+
+        return wrapper
+
+    return method_decorator(decorator)
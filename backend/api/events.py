@@ -0,0 +1,146 @@
+import asyncio
+import json
+import secrets
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import (HttpResponseNotAllowed, JsonResponse,
+                         StreamingHttpResponse)
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from recipes.events import (event_backend, event_bus, get_author_channel,
+                            get_user_channel)
+from users.models import Subscription
+
+TOKEN_KEYWORD = 'Token'
+# Комментарий-пинг не даёт прокси закрыть простаивающее соединение.
+SSE_HEARTBEAT = 20
+# Соединение закрывается через это время, EventSource переподключится
+# сам. Так соединения с ушедшими клиентами не копятся дольше.
+SSE_MAX_AGE = 300
+SSE_RETRY = 5000
+# Билет на подключение к потоку живёт недолго и действует один раз:
+# в отличие от токена, его попадание в URL и логи ничего не раскрывает.
+SSE_TICKET_KEY = 'sse-ticket:{}'
+SSE_TICKET_TIMEOUT = 30
+
+User = get_user_model()
+
+
+class EventTicketView(APIView):
+    """
+    Выдаёт билет для подключения к потоку событий: EventSource
+    в браузере не умеет передавать заголовок Authorization.
+    """
+
+    def post(self, request):
+        ticket = secrets.token_urlsafe()
+        cache.set(
+            SSE_TICKET_KEY.format(ticket), request.user.pk,
+            SSE_TICKET_TIMEOUT
+        )
+        return Response(
+            {'ticket': ticket, 'expires_in': SSE_TICKET_TIMEOUT},
+            status=status.HTTP_201_CREATED
+        )
+
+
+async def get_ticket_user_id(ticket):
+    """
+    Id пользователя по билету. Билет удаляется при первом
+    использовании, из двух одновременных погашений удаётся одно.
+    """
+    key = SSE_TICKET_KEY.format(ticket)
+    user_id = await cache.aget(key)
+    if user_id is None or not await cache.adelete(key):
+        return None
+    return user_id
+
+
+async def get_stream_user(request):
+    """
+    Пользователь по токену из заголовка Authorization
+    или по одноразовому билету из параметра ticket.
+    """
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if keyword == TOKEN_KEYWORD and key:
+        try:
+            token = await Token.objects.select_related('user').aget(key=key)
+        except Token.DoesNotExist:
+            return None
+        user = token.user
+    else:
+        ticket = request.GET.get('ticket')
+        user_id = ticket and await get_ticket_user_id(ticket)
+        if not user_id:
+            return None
+        try:
+            user = await User.objects.aget(pk=user_id)
+        except User.DoesNotExist:
+            return None
+    return user if user.is_active else None
+
+
+def format_event(event):
+    data = json.dumps(event, ensure_ascii=False)
+    return f'event: {event["type"]}\ndata: {data}\n\n'
+
+
+async def event_stream(user_id, author_ids):
+    """
+    Поток событий пользователя: его корзина, избранное и подписки,
+    а также новые рецепты авторов, на которых он подписан.
+    """
+    channels = [
+        get_user_channel(user_id), *map(get_author_channel, author_ids)
+    ]
+    async with event_bus.listen(channels) as listener:
+        yield f'retry: {SSE_RETRY}\n\n'
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SSE_MAX_AGE
+        while True:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                return
+            try:
+                event = await listener.get(min(SSE_HEARTBEAT, timeout))
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if event['type'] == 'subscription':
+                channel = get_author_channel(event['author'])
+                if event['action'] == 'added':
+                    listener.add(channel)
+                else:
+                    listener.discard(channel)
+            yield format_event(event)
+
+
+async def events_view(request):
+    """
+    Server-Sent Events для текущего пользователя.
+    Работает под ASGI: простаивающее соединение не занимает поток.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    user = await get_stream_user(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'Учетные данные не были предоставлены.'}, status=401
+        )
+    author_ids = [
+        author_id async for author_id in Subscription.objects.filter(
+            user=user
+        ).values_list('author_id', flat=True)
+    ]
+    event_backend.start()
+    response = StreamingHttpResponse(
+        event_stream(user.pk, author_ids), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,7 +1,11 @@
 import base64
 
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.files.base import ContentFile
-from rest_framework.serializers import ImageField, ValidationError
+from rest_framework.relations import (MANY_RELATION_KWARGS, ManyRelatedField,
+                                      PrimaryKeyRelatedField)
+from rest_framework.serializers import (ImageField, ListSerializer,
+                                        ValidationError)
 
 
 class Base64ImageField(ImageField):
@@ -17,3 +21,80 @@ class Base64ImageField(ImageField):
             except (ValueError, base64.binascii.Error):
                 raise ValidationError('Invalid base64 image data.')
         return super().to_internal_value(data)
+
+
+class BulkPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    Первичный ключ, который сам по себе проверяется только по типу.
+    Объекты подставляет родительский список, находя все ключи
+    одним запросом id__in.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def resolve(self, pks):
+        """
+        Возвращает объекты в порядке ключей и ошибки
+        по индексам несуществующих ключей.
+        """
+        objects = self.get_queryset().in_bulk(set(pks))
+        errors = {
+            index: self.error_messages['does_not_exist'].format(pk_value=pk)
+            for index, pk in enumerate(pks) if pk not in objects
+        }
+        return [objects.get(pk) for pk in pks], errors
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    """Список ключей, который сообщает сразу обо всех несуществующих."""
+
+    def to_internal_value(self, data):
+        pks = super().to_internal_value(data)
+        objects, errors = self.child_relation.resolve(pks)
+        if errors:
+            raise ValidationError(list(errors.values()))
+        return objects
+
+
+class BulkRelatedListSerializer(ListSerializer):
+    """
+    Список вложенных объектов, в котором поля BulkPrimaryKeyRelatedField
+    всех элементов разрешаются одним запросом на поле.
+    """
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        for field in self.child.fields.values():
+            if (
+                not isinstance(field, BulkPrimaryKeyRelatedField)
+                or field.read_only
+            ):
+                continue
+            objects, errors = field.resolve(
+                [item[field.source] for item in items]
+            )
+            if errors:
+                raise ValidationError([
+                    {field.field_name: [errors[index]]}
+                    if index in errors else {}
+                    for index in range(len(items))
+                ])
+            for item, instance in zip(items, objects):
+                item[field.source] = instance
+        return items
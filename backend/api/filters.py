@@ -1,12 +1,26 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import (BooleanFilter, CharFilter,
-                                           FilterSet,
-                                           ModelMultipleChoiceFilter)
+                                           ChoiceFilter, FilterSet,
+                                           MultipleChoiceFilter, NumberFilter)
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+
+from .recipes.services import tag_map
 
 User = get_user_model()
 
+TAGS_MATCH_ANY = 'any'
+TAGS_MATCH_ALL = 'all'
+TAGS_MATCH_CHOICES = (
+    (TAGS_MATCH_ANY, 'Хотя бы один из тегов'),
+    (TAGS_MATCH_ALL, 'Все теги'),
+)
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in tag_map.get_ids_by_slug()]
+
 
 class IngredientFilterSet(FilterSet):
     """Фильтр сет ингрединетов."""
@@ -18,11 +32,17 @@ class IngredientFilterSet(FilterSet):
 
 
 class RecipeFilterSet(FilterSet):
-    """Фильтр сет рецептов."""
-    tags = ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        queryset=Tag.objects.all(),
-        to_field_name='slug',
+    """
+    Фильтр сет рецептов.
+    Все фильтры строятся как EXISTS / NOT EXISTS, поэтому не размножают
+    строки и вместе дают один запрос без DISTINCT.
+    """
+    author = NumberFilter(field_name='author_id')
+    tags = MultipleChoiceFilter(
+        choices=get_tag_choices, method='tags_filter'
+    )
+    tags_match = ChoiceFilter(
+        choices=TAGS_MATCH_CHOICES, method='tags_match_filter'
     )
     is_favorited = BooleanFilter(method='is_favorite_filter')
     is_in_shopping_cart = BooleanFilter(method='is_in_shopping_cart_filter')
@@ -31,24 +51,53 @@ class RecipeFilterSet(FilterSet):
         model = Recipe
         fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
 
-    def _filter_by_related_name(self, queryset, related_name, user, value):
+    def __init__(self, data=None, *args, **kwargs):
+        super().__init__(data, *args, **kwargs)
+        if data is not None:
+            # Неизвестный карте слаг сверяется с базой до проверки формы.
+            tag_map.get_ids_by_slug(data.getlist('tags'))
+
+    def tags_filter(self, queryset, name, slugs):
+        """
+        Рецепты хотя бы с одним из тегов (tags_match=any)
+        или со всеми тегами сразу (tags_match=all).
+        Слаги проверяются по карте тегов без запроса к базе.
+        """
+        ids_by_slug = tag_map.get_ids_by_slug()
+        tag_ids = {ids_by_slug[slug] for slug in slugs}
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk')
+        )
+        if self.form.cleaned_data.get('tags_match') == TAGS_MATCH_ALL:
+            return queryset.filter(*(
+                Exists(recipe_tags.filter(tag_id=tag_id))
+                for tag_id in tag_ids
+            ))
+        return queryset.filter(Exists(recipe_tags.filter(tag_id__in=tag_ids)))
+
+    def tags_match_filter(self, queryset, name, value):
+        """Режим учитывается в tags_filter."""
+        return queryset
+
+    def _filter_by_related_model(self, queryset, model, user, value):
         """Общая логика фильтрации по связанным объектам."""
         if not user.is_authenticated:
             return queryset.none()
-        if value:
-            return queryset.filter(**{f'{related_name}__author': user})
-        return queryset.exclude(**{f'{related_name}__author': user})
+        related = Exists(
+            model.objects.filter(recipe_id=OuterRef('pk'), author=user)
+        )
+        return queryset.filter(related if value else ~related)
 
     def is_favorite_filter(self, queryset, name, value):
         """
         Фильтрация рецептов, добавленных в избранное текущего пользователя.
         """
-        return self._filter_by_related_name(
-            queryset, 'favorites', self.request.user, value
+        return self._filter_by_related_model(
+            queryset, Favorite, self.request.user, value
         )
 
     def is_in_shopping_cart_filter(self, queryset, name, value):
         """Фильтрация рецептов, находящихся в корзине текущего пользователя."""
-        return self._filter_by_related_name(
-            queryset, 'shopping_cart', self.request.user, value
+        return self._filter_by_related_model(
+            queryset, ShoppingCart, self.request.user, value
         )
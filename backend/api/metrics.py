@@ -0,0 +1,238 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Границы корзин гистограмм в миллисекундах и в количестве запросов.
+DURATION_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+UNRESOLVED_ROUTE = 'unresolved'
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    """Замеры одного запроса в миллисекундах."""
+
+    def __init__(self):
+        self.queries = 0
+        self.durations = defaultdict(float)
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds * 1000
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Обёртка, через которую проходят все SQL-запросы запроса."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add('db', time.perf_counter() - start)
+
+    def get_server_timing(self):
+        metrics = []
+        for name, duration in self.durations.items():
+            description = (
+                f';desc="{self.queries} queries"' if name == 'db' else ''
+            )
+            metrics.append(f'{name}{description};dur={duration:.1f}')
+        return ', '.join(metrics)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """
+    Обёртка всех соединений с базой. Замеры текущего запроса берутся
+    из контекстной переменной, поэтому учитываются и запросы
+    асинхронных представлений, выполняемые в потоках sync_to_async.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.execute_wrapper(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_execute_wrapper(sender, connection, **kwargs):
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+# Соединения, открытые до загрузки модуля.
+for db_connection in connections.all(initialized_only=True):
+    install_execute_wrapper(None, db_connection)
+
+
+@contextmanager
+def timer(name):
+    """Добавляет время выполнения блока к замерам текущего запроса."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def as_dict(self):
+        bounds = [*map(str, self.buckets), '+Inf']
+        return {
+            'count': self.total,
+            'sum': round(self.sum, 3),
+            'buckets': dict(zip(bounds, self.counts)),
+        }
+
+
+class MetricsRegistry:
+    """
+    Гистограммы замеров по маршрутам в памяти процесса.
+    Каждый воркер копит и отдаёт свои значения.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(dict)
+
+    def observe(self, route, timings):
+        values = {'queries': timings.queries, **timings.durations}
+        with self._lock:
+            histograms = self._routes[route]
+            for name, value in values.items():
+                if name not in histograms:
+                    histograms[name] = Histogram(
+                        QUERIES_BUCKETS if name == 'queries'
+                        else DURATION_BUCKETS
+                    )
+                histograms[name].observe(value)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                route: {
+                    name: histogram.as_dict()
+                    for name, histogram in histograms.items()
+                }
+                for route, histograms in self._routes.items()
+            }
+
+
+registry = MetricsRegistry()
+
+
+class ServerTimingMiddleware:
+    """
+    Считает SQL-запросы и время запроса, отдаёт их персоналу в заголовке
+    Server-Timing и копит гистограммы по имени маршрута.
+    Должен стоять первым в MIDDLEWARE. Под ASGI работает асинхронно,
+    чтобы не переводить асинхронные представления в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, start)
+
+    @staticmethod
+    def can_see_timings(request):
+        """
+        Замеры видны только персоналу или в режиме отладки.
+        Пользователь сессии, которого ещё никто не загрузил,
+        ради заголовка не загружается.
+        """
+        if settings.DEBUG:
+            return True
+        user = getattr(request, 'user', None)
+        if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+            return False
+        return user is not None and user.is_staff
+
+    def finish(self, request, response, timings, start):
+        timings.add('total', time.perf_counter() - start)
+        if self.can_see_timings(request):
+            response['Server-Timing'] = timings.get_server_timing()
+        match = request.resolver_match
+        registry.observe(
+            match.url_name or match.view_name if match else UNRESOLVED_ROUTE,
+            timings
+        )
+        return response
+
+
+class ServerTimingMixin:
+    """Замеряет время DRF-представления и корневого сериализатора."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with timer('view'):
+            return super().dispatch(request, *args, **kwargs)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        to_representation = serializer.to_representation
+
+        def timed_to_representation(*args, **kwargs):
+            with timer('serializer'):
+                return to_representation(*args, **kwargs)
+
+        serializer.to_representation = timed_to_representation
+        return serializer
+
+
+class MetricsView(APIView):
+    """Гистограммы замеров по маршрутам, только для администраторов."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(registry.as_dict())
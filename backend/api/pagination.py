@@ -1,4 +1,18 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models import F, Field, Func, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, PageNumberPagination,
+                                       _positive_int)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from recipes.feeds import get_feed_sources
 
 DEFAULT_PAGE_SIZE = 10
 
@@ -6,3 +20,214 @@ DEFAULT_PAGE_SIZE = 10
 class FoodgramPagination(PageNumberPagination):
     page_size = DEFAULT_PAGE_SIZE
     page_size_query_param = 'limit'
+
+
+class RowValues(Func):
+    """Кортеж значений (a, b, ...) для построчного сравнения."""
+    function = ''
+    output_field = Field()
+
+
+def encode_cursor_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class FoodgramCursorPagination(BasePagination):
+    """
+    Курсорная пагинация по ключу без COUNT(*) и OFFSET.
+    Курсор хранит значения всех полей порядка у крайней строки
+    страницы, следующая страница выбирается построчным сравнением
+    (created_at, id) < (%s, %s), поэтому одинаковые значения первого
+    поля не сбивают страницы. Все поля порядка должны идти
+    в одном направлении.
+    """
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = None
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_ordering(self, request, queryset, view):
+        """Порядок задаёт представление, если умеет."""
+        if hasattr(view, 'get_ordering'):
+            return view.get_ordering()
+        return self.ordering
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True, cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def decode_cursor(self, request, fields, queryset):
+        """Направление и позиция из курсора или None для первой страницы."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode()))
+            reverse, position = bool(data['r']), data['p']
+            if len(position) != len(fields):
+                raise ValueError
+            position = [
+                self.get_field(queryset, name).to_python(value)
+                for name, value in zip(fields, position)
+            ]
+        except (
+            TypeError, ValueError, KeyError, binascii.Error, ValidationError
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({
+            'r': int(reverse), 'p': list(map(encode_cursor_value, position))
+        })
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            urlsafe_b64encode(data.encode()).decode()
+        )
+
+    @staticmethod
+    def get_field(queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    def get_position(self, instance):
+        return [getattr(instance, name) for name in self.fields]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        ordering = self.get_ordering(request, queryset, view)
+        descending = {name.startswith('-') for name in ordering}
+        if len(descending) != 1:
+            raise ImproperlyConfigured(
+                'Поля порядка курсорной пагинации должны идти '
+                'в одном направлении.'
+            )
+        descending = descending.pop()
+        self.fields = [name.lstrip('-') for name in ordering]
+        cursor = self.decode_cursor(request, self.fields, queryset)
+        reverse, position = cursor if cursor is not None else (False, None)
+        if reverse:
+            ordering = [
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering
+            ]
+        results = self.get_results(
+            queryset, ordering, position, descending != reverse
+        )
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = bool(self.page), has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    @staticmethod
+    def filter_position(queryset, fields, position, before):
+        """Строки до позиции (before) или после неё по ключу fields."""
+        lookup = LessThan if before else GreaterThan
+        return queryset.filter(lookup(
+            RowValues(*map(F, fields)), RowValues(*map(Value, position))
+        ))
+
+    def get_results(self, queryset, ordering, position, before):
+        """Не больше page_size + 1 строк страницы в порядке ordering."""
+        if position is not None:
+            queryset = self.filter_position(
+                queryset, self.fields, position, before
+            )
+        return list(queryset.order_by(*ordering)[:self.page_size + 1])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_position(self.page[0]), True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class FeedPagination(FoodgramCursorPagination):
+    """
+    Курсорная пагинация ленты подписок от новых рецептов к старым.
+    Ключи страницы выбираются из строк ленты и рецептов авторов
+    без рассылки ограниченными запросами по индексам, полные рецепты
+    с аннотациями читаются только для id страницы.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+    def get_results(self, queryset, ordering, position, before):
+        direction = '-' if before else ''
+        parts = []
+        for source, fields in get_feed_sources(self.request.user, queryset):
+            if position is not None:
+                source = self.filter_position(
+                    source, fields, position, before
+                )
+            parts.append(
+                source.order_by(*(direction + name for name in fields))
+                .values_list(*fields)[:self.page_size + 1]
+            )
+        rows = parts[0].union(*parts[1:], all=True) if parts[1:] else parts[0]
+        # Рецепт автора, ставшего автором без рассылки, может быть
+        # и в строках ленты, ключи у них совпадают.
+        keys = sorted(set(rows), reverse=before)[:self.page_size + 1]
+        recipes = queryset.in_bulk([recipe_id for _, recipe_id in keys])
+        return [
+            recipes[recipe_id] for _, recipe_id in keys
+            if recipe_id in recipes
+        ]
+
+
+class RecipePagination(FoodgramPagination):
+    """
+    Постраничная пагинация рецептов.
+    При наличии параметра cursor (в т.ч. пустого) переключается
+    на курсорную, старые клиенты продолжают получать номера страниц.
+    """
+    cursor_pagination_class = FoodgramCursorPagination
+
+    def _get_cursor_paginator(self, request):
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param in request.query_params:
+            return self.cursor_pagination_class()
+        return None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = self._get_cursor_paginator(request)
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,235 @@
+import zlib
+from functools import cached_property, lru_cache
+
+from django.conf import settings
+from PIL import ImageFont
+
+# Минимальный потоковый генератор PDF для текстовых выгрузок.
+# Объекты пишутся сразу по мере готовности страниц,
+# в конце файла выводятся дерево страниц и таблица смещений.
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+PAGE_MARGIN = 50
+TEXT_WIDTH = PAGE_WIDTH - 2 * PAGE_MARGIN
+FONT_SIZE = 12
+LINE_HEIGHT = 16
+PDF_LINES_PER_PAGE = (PAGE_HEIGHT - 2 * PAGE_MARGIN) // LINE_HEIGHT
+TEXT_ENCODING = 'cp1251'
+# Метрики шрифтов в PDF задаются в тысячных долях кегля.
+GLYPH_SPACE = 1000
+FIRST_CHAR = 32
+LAST_CHAR = 255
+
+CATALOG_ID = 1
+PAGES_ID = 2
+FONT_ID = 3
+FONT_DESCRIPTOR_ID = 4
+FONT_FILE_ID = 5
+FIRST_PAGE_ID = 6
+
+UPPER_LETTERS = 'АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ'
+LOWER_LETTERS = UPPER_LETTERS.lower()
+
+
+def _get_cyrillic_differences():
+    """
+    Соответствие байтов cp1251 именам кириллических глифов.
+    По именам программа просмотра находит глифы через
+    юникодную таблицу встроенного шрифта.
+    """
+    names = {}
+    for letters, first_glyph in ((UPPER_LETTERS, 10017),
+                                 (LOWER_LETTERS, 10065)):
+        for number, letter in enumerate(letters):
+            code = letter.encode(TEXT_ENCODING)[0]
+            names[code] = f'/afii{first_glyph + number}'
+    names['№'.encode(TEXT_ENCODING)[0]] = '/afii61352'
+    return ' '.join(
+        f'{code} {name}' for code, name in sorted(names.items())
+    )
+
+
+class TrueTypeFont:
+    """
+    Встраиваемый TrueType-шрифт с кириллицей: стандартные шрифты PDF
+    её не содержат, и без встраивания русский текст мог выводиться
+    пустыми местами. Ширины глифов нужны для переноса строк.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as font_file:
+            self.data = font_file.read()
+        font = ImageFont.truetype(path, GLYPH_SPACE)
+        self.name = ''.join(font.getname()[0].split())
+        self.ascent, self.descent = font.getmetrics()
+        self.cap_height = self.ascent - font.getbbox('H')[1]
+        self.widths = {}
+        left = bottom = right = top = 0
+        for code in range(FIRST_CHAR, LAST_CHAR + 1):
+            try:
+                char = bytes([code]).decode(TEXT_ENCODING)
+            except UnicodeDecodeError:
+                continue
+            self.widths[code] = round(font.getlength(char))
+            char_left, char_top, char_right, char_bottom = font.getbbox(char)
+            left, right = min(left, char_left), max(right, char_right)
+            top = max(top, self.ascent - char_top)
+            bottom = min(bottom, self.ascent - char_bottom)
+        self.bbox = (left, bottom, right, top)
+        self.missing_width = self.widths[ord('?')]
+
+    def get_width(self, text):
+        """Ширина строки в пунктах при размере FONT_SIZE."""
+        return sum(
+            self.widths.get(code, self.missing_width)
+            for code in _encode(text)
+        ) * FONT_SIZE / GLYPH_SPACE
+
+    @cached_property
+    def objects(self):
+        """
+        Словари шрифта, его описания и сжатый файл шрифта.
+        Не зависят от выгрузки, поэтому файл сжимается один раз.
+        """
+        widths = ' '.join(
+            str(self.widths.get(code, self.missing_width))
+            for code in range(FIRST_CHAR, LAST_CHAR + 1)
+        )
+        font = (
+            f'<< /Type /Font /Subtype /TrueType /BaseFont /{self.name} '
+            f'/FirstChar {FIRST_CHAR} /LastChar {LAST_CHAR} '
+            f'/Widths [{widths}] /FontDescriptor {FONT_DESCRIPTOR_ID} 0 R '
+            '/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+            f'/Differences [{_get_cyrillic_differences()}] >> >>'
+        ).encode()
+        descriptor = (
+            f'<< /Type /FontDescriptor /FontName /{self.name} /Flags 32 '
+            f'/FontBBox [{" ".join(map(str, self.bbox))}] /ItalicAngle 0 '
+            f'/Ascent {self.ascent} /Descent {-self.descent} '
+            f'/CapHeight {self.cap_height} /StemV 80 '
+            f'/MissingWidth {self.missing_width} '
+            f'/FontFile2 {FONT_FILE_ID} 0 R >>'
+        ).encode()
+        data = zlib.compress(self.data)
+        font_file = b'<< /Length %d /Length1 %d /Filter /FlateDecode >>\n' % (
+            len(data), len(self.data)
+        ) + b'stream\n' + data + b'\nendstream'
+        return (
+            (FONT_ID, font), (FONT_DESCRIPTOR_ID, descriptor),
+            (FONT_FILE_ID, font_file)
+        )
+
+
+@lru_cache
+def get_font():
+    """Шрифт читается один раз на процесс."""
+    return TrueTypeFont(settings.PDF_FONT_PATH)
+
+
+def _encode(line):
+    return line.encode(TEXT_ENCODING, errors='replace')
+
+
+def _escape(line):
+    return (
+        _encode(line)
+        .replace(b'\\', b'\\\\')
+        .replace(b'(', b'\\(')
+        .replace(b')', b'\\)')
+    )
+
+
+class StreamingPDFWriter:
+    """Пишет PDF по одной странице текста за раз."""
+
+    def __init__(self, font=None):
+        self.font = font or get_font()
+        self.offset = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = FIRST_PAGE_ID
+
+    def _write(self, chunk):
+        self.offset += len(chunk)
+        return chunk
+
+    def _object(self, object_id, body):
+        self.offsets[object_id] = self.offset
+        return self._write(
+            b'%d 0 obj\n' % object_id + body + b'\nendobj\n'
+        )
+
+    def start(self):
+        return self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n') + b''.join(
+            self._object(object_id, body)
+            for object_id, body in self.font.objects
+        )
+
+    def wrap(self, line):
+        """
+        Разбивает строку на строки не шире страницы,
+        по пробелам, а слишком длинные слова - по символам.
+        """
+        lines = []
+        current = ''
+        for word in line.split(' '):
+            candidate = f'{current} {word}' if current else word
+            if self.font.get_width(candidate) <= TEXT_WIDTH:
+                current = candidate
+            elif self.font.get_width(word) <= TEXT_WIDTH:
+                lines.append(current)
+                current = word
+            else:
+                current = f'{current} ' if current else ''
+                for char in word:
+                    if current and (
+                        self.font.get_width(current + char) > TEXT_WIDTH
+                    ):
+                        lines.append(current.rstrip())
+                        current = ''
+                    current += char
+        lines.append(current)
+        return lines
+
+    def add_page(self, lines):
+        content = b'BT /F1 %d Tf %d TL %d %d Td\n' % (
+            FONT_SIZE, LINE_HEIGHT, PAGE_MARGIN,
+            PAGE_HEIGHT - PAGE_MARGIN - FONT_SIZE
+        ) + b''.join(
+            b'(' + _escape(line) + b') Tj T*\n' for line in lines
+        ) + b'ET'
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        return self._object(
+            content_id,
+            b'<< /Length %d >>\nstream\n' % len(content)
+            + content + b'\nendstream'
+        ) + self._object(
+            page_id,
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+            b'/Contents %d 0 R /Resources << /Font << /F1 %d 0 R >> >> >>' % (
+                PAGES_ID, PAGE_WIDTH, PAGE_HEIGHT, content_id, FONT_ID
+            )
+        )
+
+    def finish(self):
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        chunk = self._object(
+            PAGES_ID,
+            b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+                kids, len(self.page_ids)
+            )
+        ) + self._object(
+            CATALOG_ID, b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES_ID
+        )
+        xref_offset = self.offset
+        size = self.next_id
+        xref = b'xref\n0 %d\n0000000000 65535 f \n' % size + b''.join(
+            b'%010d 00000 n \n' % self.offsets[object_id]
+            for object_id in range(1, size)
+        )
+        return chunk + self._write(xref) + (
+            b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (size, CATALOG_ID, xref_offset)
+        )
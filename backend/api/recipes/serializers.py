@@ -1,13 +1,21 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
 
 from api.users.serializers import FoodgramUserSerializer
+from recipes.cache import RECIPE_FRAGMENT_TIMEOUT, get_recipe_fragment_key
 from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
                             ShoppingCart, Tag)
+from recipes.shopping_lists import change_recipe_in_shopping_lists
 
-from ..fields import Base64ImageField
+from ..fields import (Base64ImageField, BulkPrimaryKeyRelatedField,
+                      BulkRelatedListSerializer)
 
 AMOUNT_AND_TIME_MAX_VALUE = 32_000
 AMOUNT_AND_TIME_MIN_VALUE = 1
+BULK_RECIPES_MAX_LENGTH = 100
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -39,7 +47,7 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 
 class ShortIngredientInRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор короткого представления ингредиента."""
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all(), source='ingredient'
     )
     amount = serializers.IntegerField(
@@ -50,9 +58,87 @@ class ShortIngredientInRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = IngredientInRecipe
         fields = ('id', 'amount')
+        list_serializer_class = BulkRelatedListSerializer
+
+
+class AuthorFragmentSerializer(FoodgramUserSerializer):
+    """Профиль автора без зависящего от пользователя поля is_subscribed."""
+    is_subscribed = None
+
+    class Meta(FoodgramUserSerializer.Meta):
+        fields = tuple(
+            field for field in FoodgramUserSerializer.Meta.fields
+            if field != 'is_subscribed'
+        )
+
+
+class RecipeFragmentSerializer(serializers.ModelSerializer):
+    """
+    Независимая от пользователя часть рецепта, которая хранится в кэше.
+    Ссылки на изображения остаются относительными.
+    """
+    author = AuthorFragmentSerializer(read_only=True)
+    tags = TagSerializer(many=True)
+    ingredients = IngredientInRecipeSerializer(
+        many=True, source='recipe_ingredients'
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id',
+            'tags',
+            'author',
+            'ingredients',
+            'name',
+            'image',
+            'text',
+            'cooking_time',
+        )
+
+
+def get_recipe_fragments(recipes):
+    """
+    Возвращает фрагменты рецептов из кэша.
+    Недостающие сериализует одним набором запросов и кладёт в кэш.
+    """
+    keys = {get_recipe_fragment_key(recipe.pk): recipe for recipe in recipes}
+    fragments = cache.get_many(keys)
+    missing = [recipe for key, recipe in keys.items() if key not in fragments]
+    if missing:
+        prefetch_related_objects(
+            missing, 'tags', 'recipe_ingredients__ingredient', 'author'
+        )
+        new_fragments = {
+            get_recipe_fragment_key(recipe.pk):
+                RecipeFragmentSerializer(recipe).data
+            for recipe in missing
+        }
+        cache.set_many(new_fragments, RECIPE_FRAGMENT_TIMEOUT)
+        fragments.update(new_fragments)
+    return {recipe.pk: fragments[key] for key, recipe in keys.items()}
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Получает фрагменты всей страницы рецептов одним обращением к кэшу."""
+
+    def to_representation(self, data):
+        if isinstance(data, BaseManager):
+            data = data.all()
+        recipes = list(data)
+        fragments = get_recipe_fragments(recipes)
+        return [
+            self.child.to_representation(recipe, fragments[recipe.pk])
+            for recipe in recipes
+        ]
 
 
 class RecipeSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор представления рецепта.
+    Общая часть берётся из кэша фрагментов, поверх добавляются
+    флаги текущего пользователя.
+    """
     author = FoodgramUserSerializer(read_only=True)
     tags = TagSerializer(many=True)
     ingredients = IngredientInRecipeSerializer(
@@ -75,9 +161,12 @@ class RecipeSerializer(serializers.ModelSerializer):
             'text',
             'cooking_time',
         )
+        list_serializer_class = RecipeListSerializer
 
     def get_is_favorited(self, obj):
         """Проверяет рецепт в избранном текущего пользователя."""
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         return (
             user.is_authenticated
@@ -86,18 +175,50 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """Проверяет рецепт в корзине текущего пользователя."""
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         return (
             user.is_authenticated
             and user.shopping_cart.filter(recipe=obj).exists()
         )
 
+    def get_is_author_subscribed(self, obj):
+        """Проверяет подписку текущего пользователя на автора рецепта."""
+        if hasattr(obj, 'is_author_subscribed'):
+            return obj.is_author_subscribed
+        user = self.context['request'].user
+        return (
+            user.is_authenticated
+            and user.subscriptions.filter(author=obj.author_id).exists()
+        )
+
+    def to_representation(self, instance, fragment=None):
+        if fragment is None:
+            fragment = get_recipe_fragments([instance])[instance.pk]
+        request = self.context['request']
+        author = dict(
+            fragment['author'],
+            is_subscribed=self.get_is_author_subscribed(instance)
+        )
+        if author['avatar']:
+            author['avatar'] = request.build_absolute_uri(author['avatar'])
+        representation = dict(
+            fragment,
+            author={
+                field: author[field]
+                for field in FoodgramUserSerializer.Meta.fields
+            },
+            image=request.build_absolute_uri(fragment['image']),
+            is_favorited=self.get_is_favorited(instance),
+            is_in_shopping_cart=self.get_is_in_shopping_cart(instance),
+        )
+        return {field: representation[field] for field in self.Meta.fields}
+
 
 class CreateRecipeSerializer(serializers.ModelSerializer):
     ingredients = ShortIngredientInRecipeSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
-    )
+    tags = BulkPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
     image = Base64ImageField()
     cooking_time = serializers.IntegerField(
         max_value=AMOUNT_AND_TIME_MAX_VALUE,
@@ -148,31 +269,78 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             )
         return image_data
 
-    def _save_tags(self, instance, tags_data):
-        """Обработка тегов для рецепта."""
-        instance.tags.set(tags_data)
-
-    def _save_ingredients(self, instance, ingredients_data):
-        """Обработка ингредиентов для рецепта."""
-        instance.recipe_ingredients.all().delete()
+    def _save_tags(self, instance, tags_data, created=False):
+        """Обработка тегов для рецепта: меняются только отличия."""
+        tag_ids = {tag.pk for tag in tags_data}
+        current_ids = (
+            set() if created
+            else set(instance.tags.values_list('pk', flat=True))
+        )
+        if current_ids - tag_ids:
+            instance.tags.remove(*(current_ids - tag_ids))
+        if tag_ids - current_ids:
+            instance.tags.add(*(tag_ids - current_ids))
+
+    def _save_ingredients(self, instance, ingredients_data, created=False):
+        """
+        Обработка ингредиентов для рецепта: удаляются только убранные,
+        обновляются изменённые и добавляются новые строки.
+        """
+        amounts = {
+            ingredient['ingredient'].pk: ingredient['amount']
+            for ingredient in ingredients_data
+        }
+        current = (
+            {} if created
+            else {
+                recipe_ingredient.ingredient_id: recipe_ingredient
+                for recipe_ingredient in instance.recipe_ingredients.all()
+            }
+        )
+        removed = current.keys() - amounts.keys()
+        if removed:
+            # Убранные ингредиенты вычитает из списков покупок
+            # сигнал post_delete.
+            IngredientInRecipe.objects.filter(pk__in=[
+                current[ingredient_id].pk for ingredient_id in removed
+            ]).delete()
+        deltas = {}
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            recipe_ingredient = current.get(ingredient_id)
+            if recipe_ingredient and recipe_ingredient.amount != amount:
+                deltas[ingredient_id] = amount - recipe_ingredient.amount
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        added = amounts.keys() - current.keys()
         IngredientInRecipe.objects.bulk_create([
             IngredientInRecipe(
                 recipe=instance,
-                ingredient=ingredient['ingredient'],
-                amount=ingredient['amount']
+                ingredient_id=ingredient_id,
+                amount=amounts[ingredient_id]
             )
-            for ingredient in ingredients_data
+            for ingredient_id in added
         ])
+        deltas.update(
+            (ingredient_id, amounts[ingredient_id]) for ingredient_id in added
+        )
+        # Массовые операции не отправляют сигналы, поэтому списки покупок
+        # обновляются явно. Кэш рецепта сбросит instance.save() в update.
+        if not created:
+            change_recipe_in_shopping_lists(instance.pk, deltas)
 
+    @transaction.atomic
     def create(self, validated_data):
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
         user = self.context['request'].user
         recipe = Recipe.objects.create(author=user, **validated_data)
-        self._save_tags(recipe, tags_data)
-        self._save_ingredients(recipe, ingredients_data)
+        self._save_tags(recipe, tags_data, created=True)
+        self._save_ingredients(recipe, ingredients_data, created=True)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         if 'ingredients' not in self.initial_data:
             raise serializers.ValidationError({
@@ -206,6 +374,15 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для массового добавления и удаления."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_RECIPES_MAX_LENGTH
+    )
+
+
 class AuthorRecipeSerializer(serializers.ModelSerializer):
     """Абстрактный сериализатор автора и рецепта."""
 
@@ -216,15 +393,6 @@ class AuthorRecipeSerializer(serializers.ModelSerializer):
         fields = ('author', 'recipe')
         read_only_fields = ('author',)
 
-    def validate(self, attrs):
-        recipe = attrs['recipe']
-        user = self.context['request'].user
-        if self.Meta.model.objects.filter(author=user, recipe=recipe).exists():
-            raise serializers.ValidationError(
-                f'Рецепт уже добавлен в {self._recipe_added_to}.'
-            )
-        return attrs
-
     def to_representation(self, instance):
         return ShortRecipeSerializer(
             instance.recipe, context=self.context
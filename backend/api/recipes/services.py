@@ -1,23 +1,215 @@
-from django.db.models import Sum
+import csv
+import io
+from bisect import bisect_left, bisect_right
+from itertools import chain, islice
 
-from recipes.models import IngredientInRecipe
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramWordSimilarity)
+from django.db.models import BooleanField, Exists, F, FloatField, Q, Value
+from django.db.models.functions import Cast, Coalesce
 
+from recipes.cache import INGREDIENTS_VERSION, TAGS_VERSION, VersionedSnapshot
+from recipes.constants import RECIPE_SEARCH_CONFIG
+from recipes.models import Ingredient, Tag
 
-def generate_shopping_list(user):
-    """Генерирует содержимое файла со списком покупок текущего пользователя."""
-    shopping_cart = (
-        IngredientInRecipe.objects
-        .filter(recipe__shopping_cart__author=user)
-        .values('ingredient__name', 'ingredient__measurement_unit')
-        .annotate(total_amount=Sum('amount'))
+from .pdf import PDF_LINES_PER_PAGE, StreamingPDFWriter
+
+SHOPPING_LIST_CSV_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+
+
+def get_shopping_list_rows(user):
+    """
+    Строки списка покупок текущего пользователя:
+    название, единица измерения и общее количество.
+    Читаются из сводной таблицы, которая ведётся сигналами.
+    """
+    return (
+        user.shopping_list
+        .values_list(
+            'ingredient__name', 'ingredient__measurement_unit',
+            'total_amount'
+        )
+        .order_by('ingredient__name', 'ingredient__measurement_unit')
+        .iterator()
     )
-    if not shopping_cart.exists():
+
+
+def generate_shopping_list_txt(rows):
+    """Генерирует список покупок в текстовом формате."""
+    yield 'Список покупок:\n\n'
+    for name, measurement_unit, total_amount in rows:
+        yield f'- {name} ({total_amount} {measurement_unit})\n'
+
+
+def generate_shopping_list_csv(rows):
+    """Генерирует список покупок в формате CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in chain([SHOPPING_LIST_CSV_HEADER], rows):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def generate_shopping_list_pdf(rows):
+    """
+    Генерирует список покупок в формате PDF постранично.
+    В памяти держится только текущая страница и смещения объектов.
+    """
+    writer = StreamingPDFWriter()
+    lines = chain.from_iterable(map(writer.wrap, chain(
+        ['Список покупок:', ''],
+        (
+            f'- {name} ({total_amount} {measurement_unit})'
+            for name, measurement_unit, total_amount in rows
+        )
+    )))
+    yield writer.start()
+    while True:
+        page = list(islice(lines, PDF_LINES_PER_PAGE))
+        if not page:
+            break
+        yield writer.add_page(page)
+    yield writer.finish()
+
+
+SHOPPING_LIST_GENERATORS = {
+    'txt': generate_shopping_list_txt,
+    'csv': generate_shopping_list_csv,
+    'pdf': generate_shopping_list_pdf,
+}
+
+
+def generate_shopping_list(user, file_format='txt'):
+    """
+    Возвращает генератор файла со списком покупок
+    или None, если список пуст.
+    """
+    rows = get_shopping_list_rows(user)
+    first_row = next(rows, None)
+    if first_row is None:
         return None
-    shopping_list = 'Список покупок:\n\n'
-    for item in shopping_cart:
-        shopping_list += (
-            f'- {item["ingredient__name"]} '
-            f'({item["total_amount"]} '
-            f'{item["ingredient__measurement_unit"]})\n'
+    return SHOPPING_LIST_GENERATORS[file_format](chain([first_row], rows))
+
+
+def search_recipes(queryset, text):
+    """
+    Полнотекстовый поиск по названию и описанию с русской морфологией
+    и нечёткий поиск опечаток в названии по триграммам.
+    Оба условия проверяются по GIN-индексам, релевантность
+    добавляется в поле search_rank.
+    """
+    query = SearchQuery(
+        text, config=RECIPE_SEARCH_CONFIG, search_type='websearch'
+    )
+    return queryset.filter(
+        Q(search_vector=query) | Q(name__trigram_word_similar=text)
+    ).annotate(
+        # ts_rank возвращает real; приведение к double precision нужно,
+        # чтобы позиция курсора совпадала со значением в базе.
+        # Вектор ещё не заполненного рецепта дал бы NULL, а строка
+        # с NULL выпала бы из сравнения (search_rank, id) < (%s, %s).
+        search_rank=Cast(
+            Coalesce(SearchRank(F('search_vector'), query), Value(0.0))
+            + TrigramWordSimilarity(text, 'name'),
+            FloatField()
         )
-    return shopping_list
+    )
+
+
+def annotate_user_flags(queryset, user, **subqueries):
+    """
+    Добавляет к выборке флаги, связанные с текущим пользователем.
+    Для анонима флаги всегда ложны и подзапросы не строятся.
+    """
+    if not user.is_authenticated:
+        return queryset.annotate(**{
+            name: Value(False, output_field=BooleanField())
+            for name in subqueries
+        })
+    return queryset.annotate(**{
+        name: Exists(subquery) for name, subquery in subqueries.items()
+    })
+
+
+class IngredientIndex(VersionedSnapshot):
+    """
+    Префиксный индекс ингредиентов в памяти процесса для автодополнения.
+    Ключи приведены к нижнему регистру, ё заменена на е.
+    Для поиска подстроки ключи склеены в одну строку.
+    Индекс строится при первом поиске и перестраивается,
+    когда меняется версия ингредиентов.
+    """
+    version_name = INGREDIENTS_VERSION
+
+    @staticmethod
+    def normalize(value):
+        return value.casefold().replace('ё', 'е')
+
+    def build(self):
+        items = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda item: (
+                self.normalize(item['name']), item['measurement_unit']
+            )
+        )
+        keys = tuple(self.normalize(item['name']) for item in items)
+        offsets = []
+        position = 0
+        for key in keys:
+            offsets.append(position)
+            position += len(key) + 1
+        return keys, tuple(items), '\n'.join(keys), offsets
+
+    def search(self, query):
+        """
+        Ингредиенты, название которых начинается с query,
+        а следом те, что содержат query в середине.
+        """
+        keys, items, text, offsets = self.get()
+        query = self.normalize(query).replace('\n', '')
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        substring_matches = []
+        position = text.find(query)
+        while position != -1:
+            index = bisect_right(offsets, position) - 1
+            if not start <= index < end:
+                substring_matches.append(items[index])
+            if index + 1 == len(offsets):
+                break
+            position = text.find(query, offsets[index + 1])
+        return [*items[start:end], *substring_matches]
+
+
+ingredient_index = IngredientIndex()
+
+
+class TagMap(VersionedSnapshot):
+    """
+    Соответствие слагов тегов их id в памяти процесса.
+    Перестраивается, когда меняется версия тегов.
+    """
+    version_name = TAGS_VERSION
+
+    def build(self):
+        return dict(Tag.objects.values_list('slug', 'pk'))
+
+    def get_ids_by_slug(self, slugs=()):
+        """
+        Если среди slugs есть неизвестные карте, но существующие в базе
+        теги, карта перестраивается: тег мог появиться без обновления
+        версии тегов, например при загрузке данных в обход сигналов
+        или в другом процессе с кэшем в памяти.
+        """
+        ids_by_slug = self.get()
+        missing = set(slugs) - ids_by_slug.keys()
+        if missing and Tag.objects.filter(slug__in=missing).exists():
+            ids_by_slug = self.refresh()
+        return ids_by_slug
+
+
+tag_map = TagMap()
@@ -1,40 +1,91 @@
+from django.db.models import F, OuterRef
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from recipes.cache import (INGREDIENTS_VERSION, POPULARITY_VERSION,
+                           RECIPES_VERSION, TAGS_VERSION)
 from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
-from shortener.models import UrlMap
-from shortener.services import generate_unique_code
+from recipes.relations import (add_recipe, bulk_add_recipes,
+                               bulk_remove_recipes, remove_recipe)
+from shortener.services import encode_recipe_id
+from users.models import Subscription
 
+from ..conditional import data_version_condition
 from ..filters import IngredientFilterSet, RecipeFilterSet
-from ..pagination import FoodgramPagination
+from ..metrics import ServerTimingMixin
+from ..pagination import (FeedPagination, FoodgramCursorPagination,
+                          RecipePagination)
 from ..permissions import IsAuthorOrReadOnly
+from ..renderers import CSVRenderer, PDFRenderer, PlainTextRenderer
 from .serializers import (CreateRecipeSerializer, FavoriteSerializer,
-                          IngredientSerializer, RecipeSerializer,
-                          ShoppingCartSerializer, TagSerializer)
-from .services import generate_shopping_list
+                          IngredientSerializer, RecipeIdsSerializer,
+                          RecipeSerializer, ShoppingCartSerializer,
+                          TagSerializer)
+from .services import (annotate_user_flags, generate_shopping_list,
+                       ingredient_index, search_recipes)
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(ServerTimingMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AllowAny]
 
+    @data_version_condition(TAGS_VERSION)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+    @data_version_condition(TAGS_VERSION)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class IngredientViewSet(ServerTimingMixin, ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilterSet
 
+    @data_version_condition(INGREDIENTS_VERSION)
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
+
+    @data_version_condition(INGREDIENTS_VERSION)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+# Курсор хранит все поля порядка: строки с одинаковым числом
+# добавлений в избранное различаются по (created_at, id).
+RECIPE_ORDERINGS = {
+    'popular': ('-favorites_count', '-created_at', '-id'),
+}
+DEFAULT_RECIPE_ORDERING = ('-created_at', '-id')
+TRENDING_ORDERING = ('-trending_score', '-id')
+SEARCH_ORDERING = ('-search_rank', '-id')
+
+
+def get_popularity_version(request):
+    """Порядок popular зависит от счётчиков избранного."""
+    if request.query_params.get('ordering') == 'popular':
+        return POPULARITY_VERSION
+    return None
 
-class RecipeViewSet(ModelViewSet):
-    pagination_class = FoodgramPagination
+
+class RecipeViewSet(ServerTimingMixin, ModelViewSet):
+    pagination_class = RecipePagination
     permission_classes = [IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilterSet
@@ -46,12 +97,83 @@ class RecipeViewSet(ModelViewSet):
             queryset = queryset.filter(favorited_by__author=user)
         elif self.action == 'shopping_cart':
             queryset = queryset.filter(shopping_cart__author=user)
-        return queryset.prefetch_related(
-            'tags', 'recipe_ingredients__ingredient', 'author'
-        ).order_by('-created_at').all()
+        elif self.action == 'trending':
+            queryset = queryset.filter(trending__isnull=False).annotate(
+                trending_score=F('trending__score')
+            )
+        elif self.get_search_text():
+            queryset = search_recipes(queryset, self.get_search_text())
+        queryset = annotate_user_flags(
+            queryset, user,
+            is_favorited=Favorite.objects.filter(
+                recipe=OuterRef('pk'), author=user.pk
+            ),
+            is_in_shopping_cart=ShoppingCart.objects.filter(
+                recipe=OuterRef('pk'), author=user.pk
+            ),
+            is_author_subscribed=Subscription.objects.filter(
+                author=OuterRef('author'), user=user.pk
+            ),
+        )
+        # Теги, ингредиенты и автор подгружаются только для рецептов,
+        # которых нет в кэше фрагментов.
+        return queryset.order_by(*self.get_ordering())
+
+    def get_search_text(self):
+        if self.action != 'list':
+            return ''
+        return self.request.query_params.get('search', '').strip()
+
+    def get_ordering(self):
+        if self.action == 'trending':
+            return TRENDING_ORDERING
+        if self.get_search_text():
+            return SEARCH_ORDERING
+        return RECIPE_ORDERINGS.get(
+            self.request.query_params.get('ordering'),
+            DEFAULT_RECIPE_ORDERING
+        )
+
+    @data_version_condition(
+        RECIPES_VERSION, get_popularity_version, per_user=True
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @data_version_condition(RECIPES_VERSION, per_user=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def trending(self, request):
+        """
+        Популярные рецепты из предрассчитанного рейтинга
+        с курсорной пагинацией.
+        """
+        paginator = FoodgramCursorPagination()
+        page = paginator.paginate_queryset(
+            self.filter_queryset(self.get_queryset()), request, view=self
+        )
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False, methods=['get'], permission_classes=[IsAuthenticated]
+    )
+    def feed(self, request):
+        """
+        Рецепты авторов, на которых подписан пользователь,
+        с курсорной пагинацией.
+        """
+        paginator = FeedPagination()
+        page = paginator.paginate_queryset(
+            self.filter_queryset(self.get_queryset()), request, view=self
+        )
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'trending', 'feed']:
             return RecipeSerializer
         elif self.action == 'favorite':
             return FavoriteSerializer
@@ -61,60 +183,88 @@ class RecipeViewSet(ModelViewSet):
 
     def _post_relationship(self, model, serializer_class, user, recipe):
         """Общая логика добавления в избранное или список покупок."""
+        if not add_recipe(model, user, recipe.id):
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                f'Рецепт уже добавлен в {serializer_class._recipe_added_to}.'
+            ]})
         serializer = serializer_class(
-            data={'recipe': recipe.id}, context={'request': self.request}
+            model(author=user, recipe=recipe),
+            context={'request': self.request}
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save(author=user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def _delete_relationship(self, model, user, recipe):
+    def _delete_relationship(self, model, user, pk):
         """Общая логика удаления из избранного или списка покупок."""
-        item = model.objects.filter(author=user, recipe=recipe).first()
-        if item:
-            item.delete()
+        if remove_recipe(model, user, pk):
             return Response(
                 {'detail': f'Рецепт удалён из {model._meta.verbose_name}.'},
                 status=status.HTTP_204_NO_CONTENT
             )
+        # Рецепт проверяется, только если удалять было нечего.
+        get_object_or_404(Recipe, pk=pk)
         return Response(
             {'detail': f'Рецепт отсутствует в {model._meta.verbose_name}.'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    def _bulk_relationship(self, model, request):
+        """
+        Массовое добавление (POST) или удаление (DELETE) рецептов
+        с результатом по каждому id.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if request.method == 'POST':
+            groups = bulk_add_recipes(model, request.user, recipe_ids)
+            statuses = ('added', 'exists', 'not_found')
+        else:
+            groups = bulk_remove_recipes(model, request.user, recipe_ids)
+            statuses = ('removed', 'absent', 'not_found')
+        results = {
+            recipe_id: result
+            for result, group in zip(statuses, groups)
+            for recipe_id in group
+        }
+        return Response({'results': [
+            {'id': recipe_id, 'status': results[recipe_id]}
+            for recipe_id in dict.fromkeys(recipe_ids)
+        ]})
+
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_short_link(self, request, pk=None):
         """Возвращает короткую ссылку на рецепт."""
         recipe = get_object_or_404(Recipe, pk=pk)
-        domain = request.get_host()
-        scheme = request.scheme
-        short_code = generate_unique_code()
-        url_map, created = UrlMap.objects.get_or_create(
-            recipe=recipe,
-            defaults={
-                'full_url': f'{scheme}://{domain}/recipes/{recipe.id}/',
-                'short_code': short_code,
-                'short_url': f'/s/{short_code}'
-            }
+        short_url = reverse(
+            'shortener:redirect', args=(encode_recipe_id(recipe.id),)
         )
         return Response(
-            {'short-link': f'{scheme}://{domain}{url_map.short_url}'}
+            {'short-link': request.build_absolute_uri(short_url)}
         )
 
-    @action(detail=False, methods=['get'], url_path='download_shopping_cart')
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='download_shopping_cart',
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[PlainTextRenderer, CSVRenderer, PDFRenderer],
+    )
     def download_shopping_cart(self, request):
-        """Скачать список покупок."""
-        user = request.user
-        shopping_list = generate_shopping_list(user)
-        if not shopping_list:
+        """
+        Скачать список покупок.
+        Формат выбирается параметром format: txt, csv или pdf.
+        """
+        renderer = request.accepted_renderer
+        shopping_list = generate_shopping_list(request.user, renderer.format)
+        if shopping_list is None:
             return Response(
-                'Список покупок пуст.',
-                content_type='text/plain',
-                status=status.HTTP_204_NO_CONTENT
+                'Список покупок пуст.', status=status.HTTP_204_NO_CONTENT
             )
-        response = Response(shopping_list, content_type='text/plain')
+        response = StreamingHttpResponse(
+            shopping_list, content_type=renderer.media_type
+        )
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+            f'attachment; filename="shopping_list.{renderer.format}"'
         )
         return response
 
@@ -127,8 +277,7 @@ class RecipeViewSet(ModelViewSet):
 
     @shopping_cart.mapping.delete
     def remove_from_shopping_cart(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        return self._delete_relationship(ShoppingCart, request.user, recipe)
+        return self._delete_relationship(ShoppingCart, request.user, pk)
 
     @action(detail=True, methods=['post'], url_path='favorite')
     def favorites(self, request, pk=None):
@@ -139,5 +288,13 @@ class RecipeViewSet(ModelViewSet):
 
     @favorites.mapping.delete
     def remove_from_favorites(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        return self._delete_relationship(Favorite, request.user, recipe)
+        return self._delete_relationship(Favorite, request.user, pk)
+
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='shopping_cart/bulk')
+    def bulk_shopping_cart(self, request):
+        return self._bulk_relationship(ShoppingCart, request)
+
+    @action(detail=False, methods=['post', 'delete'], url_path='favorite/bulk')
+    def bulk_favorites(self, request):
+        return self._bulk_relationship(Favorite, request)
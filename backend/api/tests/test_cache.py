@@ -0,0 +1,28 @@
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .utils import FoodgramTestCase
+
+
+class PostgresCacheTests(FoodgramTestCase):
+    """Пакетная запись в кэш-таблицу Postgres."""
+
+    def test_set_many(self):
+        cache.set('first', 'old')
+        data = {f'key-{index}': {'index': index} for index in range(10)}
+        data['first'] = 'new'
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(cache.set_many(data), [])
+        # COUNT для вытеснения и один INSERT с точкой сохранения.
+        self.assertLessEqual(len(context), 4)
+        self.assertEqual(cache.get_many(data), data)
+
+    def test_timeouts(self):
+        cache.set_many({'forever': 1}, None)
+        cache.set_many({'expired': 1}, 1)
+        self.assertEqual(cache.get('forever'), 1)
+        time.sleep(1.1)
+        self.assertIsNone(cache.get('expired'))
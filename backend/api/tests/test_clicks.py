@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+from django.db import DatabaseError
+
+from shortener.clicks import ClickBuffer
+from shortener.models import LinkClicks
+
+from .utils import FoodgramTestCase, create_recipe, create_user
+
+MISSING_RECIPE_ID = 10 ** 9
+
+
+class ClickBufferTests(FoodgramTestCase):
+    """Переходы копятся в памяти и пишутся в базу пачкой."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.first, cls.second = create_recipe(author), create_recipe(author)
+        LinkClicks.objects.create(recipe=cls.first, clicks=10)
+
+    def get_clicks(self):
+        return dict(LinkClicks.objects.values_list('recipe_id', 'clicks'))
+
+    def test_flush_by_size(self):
+        buffer = ClickBuffer(flush_size=3)
+        buffer.add(self.first.pk)
+        buffer.add(self.second.pk)
+        self.assertEqual(self.get_clicks(), {self.first.pk: 10})
+        buffer.add(self.first.pk)
+        self.assertEqual(
+            self.get_clicks(), {self.first.pk: 12, self.second.pk: 1}
+        )
+
+    def test_flush_by_time(self):
+        with patch('shortener.clicks.time.monotonic', return_value=0):
+            buffer = ClickBuffer(flush_interval=60)
+            buffer.add(self.second.pk)
+        self.assertEqual(self.get_clicks(), {self.first.pk: 10})
+        with patch('shortener.clicks.time.monotonic', return_value=60):
+            buffer.add(self.second.pk)
+        self.assertEqual(
+            self.get_clicks(), {self.first.pk: 10, self.second.pk: 2}
+        )
+
+    def test_failed_flush_requeues_clicks(self):
+        buffer = ClickBuffer()
+        buffer.add(self.first.pk)
+        with patch.object(
+            ClickBuffer, '_write', side_effect=DatabaseError
+        ), self.assertLogs('shortener.clicks', 'ERROR'):
+            buffer.flush()
+        buffer.add(self.first.pk)
+        buffer.flush()
+        self.assertEqual(self.get_clicks(), {self.first.pk: 12})
+
+    def test_flush_queries(self):
+        buffer = ClickBuffer()
+        for recipe_id in (self.first.pk, self.second.pk, self.second.pk,
+                          MISSING_RECIPE_ID):
+            buffer.add(recipe_id)
+        # Существующие рецепты, вставка новых счётчиков и один UPDATE.
+        with self.assertNumQueries(3):
+            buffer.flush()
+        self.assertEqual(
+            self.get_clicks(), {self.first.pk: 11, self.second.pk: 2}
+        )
+        with self.assertNumQueries(0):
+            buffer.flush()
@@ -0,0 +1,78 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import transaction
+
+from recipes.cache import get_data_versions
+from recipes.checks import check_shared_cache
+from recipes.models import Favorite, Recipe
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+
+class DataVersionConditionTests(FoodgramTestCase):
+    """ETag меняется после записи и только после её фиксации."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.recipe = create_recipe(create_user('author'))
+
+    def setUp(self):
+        super().setUp()
+        self.client = get_client(self.user)
+        self.etag = self.client.get('/api/recipes/')['ETag']
+
+    def get_recipes(self):
+        return self.client.get('/api/recipes/', HTTP_IF_NONE_MATCH=self.etag)
+
+    def test_not_modified(self):
+        response = self.get_recipes()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_modified_after_favorite(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        response = self.get_recipes()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'][0]['is_favorited'])
+
+    def test_modified_after_recipe_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.name = 'Новое название'
+            self.recipe.save()
+        response = self.get_recipes()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data['results'][0]['name'], 'Новое название'
+        )
+
+    def test_modified_after_reconcile_counters(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(favorites_count=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_counters', stdout=StringIO())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+        self.assertEqual(self.get_recipes().status_code, 200)
+
+    def test_version_bumped_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                Favorite.objects.create(author=self.user, recipe=self.recipe)
+        self.assertEqual(self.get_recipes().status_code, 304)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get_recipes().status_code, 200)
+
+    def test_default_cache_is_shared(self):
+        # Версии, поднятые другими процессами, видны только в общем кэше.
+        self.assertEqual(check_shared_cache(None), [])
+
+    def test_versions_read_once(self):
+        with patch(
+            'api.conditional.get_data_versions', wraps=get_data_versions
+        ) as mocked:
+            self.get_recipes()
+        self.assertEqual(mocked.call_count, 1)
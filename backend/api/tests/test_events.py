@@ -0,0 +1,35 @@
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+from rest_framework.authtoken.models import Token
+
+from api.events import get_stream_user
+
+from .utils import FoodgramTestCase, create_user, get_client
+
+TICKET_URL = '/api/events/ticket/'
+
+
+class EventTicketTests(FoodgramTestCase):
+    """Поток событий открывается по одноразовому билету."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+
+    def get_stream_user(self, **params):
+        request = RequestFactory().get('/api/events/', params)
+        return async_to_sync(get_stream_user)(request)
+
+    def test_ticket_is_single_use(self):
+        response = get_client(self.user).post(TICKET_URL)
+        self.assertEqual(response.status_code, 201)
+        ticket = response.data['ticket']
+        self.assertEqual(self.get_stream_user(ticket=ticket), self.user)
+        self.assertIsNone(self.get_stream_user(ticket=ticket))
+
+    def test_token_in_query_is_rejected(self):
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.assertIsNone(self.get_stream_user(token=token.key))
+
+    def test_ticket_requires_authentication(self):
+        self.assertEqual(get_client().post(TICKET_URL).status_code, 401)
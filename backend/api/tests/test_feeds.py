@@ -0,0 +1,204 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from recipes.feeds import FEED_BACKFILL_SIZE, rebuild_feeds
+from recipes.models import FeedItem, FeedPullAuthor, Recipe, Tag
+from users.models import Subscription
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+FEED_URL = '/api/recipes/feed/'
+
+
+class FeedTests(FoodgramTestCase):
+    """Лента содержит рецепты авторов из подписок и только их."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.author = create_user('author')
+        cls.pull_author = create_user('pull_author')
+        cls.stranger = create_user('stranger')
+        FeedPullAuthor.objects.create(author=cls.pull_author)
+
+    def setUp(self):
+        super().setUp()
+        self.client = get_client(self.user)
+
+    def subscribe(self, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/users/{author.pk}/subscribe/')
+
+    def create_recipe(self, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_recipe(author)
+
+    def get_feed_ids(self):
+        response = self.client.get(FEED_URL)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_feed_contents(self):
+        old = self.create_recipe(self.author)
+        self.create_recipe(self.stranger)
+        self.subscribe(self.author)
+        self.subscribe(self.pull_author)
+        new = self.create_recipe(self.author)
+        pulled = self.create_recipe(self.pull_author)
+        self.assertEqual(
+            self.get_feed_ids(), [pulled.pk, new.pk, old.pk]
+        )
+        self.assertFalse(
+            FeedItem.objects.filter(recipe__author=self.pull_author).exists()
+        )
+        feed_item = FeedItem.objects.get(user=self.user, recipe=new)
+        self.assertEqual(feed_item.created_at, new.created_at)
+
+    def test_unsubscribe_prunes_feed(self):
+        self.subscribe(self.author)
+        self.create_recipe(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(self.get_feed_ids(), [])
+
+    def test_push_waits_for_commit(self):
+        self.subscribe(self.author)
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe = create_recipe(self.author)
+            self.assertFalse(FeedItem.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get_feed_ids(), [recipe.pk])
+
+    def test_backfill_size(self):
+        for _ in range(FEED_BACKFILL_SIZE + 1):
+            create_recipe(self.author)
+        self.subscribe(self.author)
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.user).count(),
+            FEED_BACKFILL_SIZE
+        )
+
+
+class FeedPaginationTests(FoodgramTestCase):
+    """Страницы ленты сливают строки ленты и рецепты без рассылки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        authors = [create_user('author'), create_user('second_author')]
+        pull_author = create_user('pull_author')
+        FeedPullAuthor.objects.create(author=pull_author)
+        for author in [*authors, pull_author]:
+            Subscription.objects.create(user=cls.user, author=author)
+        cls.recipes = [
+            create_recipe(author)
+            for _ in range(5)
+            for author in [*authors, pull_author]
+        ]
+        # Одинаковое время создания у части рецептов.
+        Recipe.objects.filter(pk__in=[
+            recipe.pk for recipe in cls.recipes[:6]
+        ]).update(created_at=timezone.now())
+        rebuild_feeds()
+        cls.expected = list(
+            Recipe.objects.filter(pk__in=[r.pk for r in cls.recipes])
+            .values_list('pk', flat=True)
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = get_client(self.user)
+
+    def collect(self, url):
+        ids = []
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        return ids, pages
+
+    def test_pages(self):
+        ids, pages = self.collect(f'{FEED_URL}?limit=4')
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(len(pages), 4)
+        previous = self.client.get(pages[2]['previous']).data
+        self.assertEqual(previous['results'], pages[1]['results'])
+
+    def test_filters_apply_before_paging(self):
+        tag = Tag.objects.create(name='Суп', slug='soup')
+        tagged = self.recipes[::3]
+        for recipe in tagged:
+            recipe.tags.add(tag)
+        ids, _ = self.collect(f'{FEED_URL}?limit=2&tags=soup')
+        self.assertEqual(ids, [
+            pk for pk in self.expected
+            if pk in {recipe.pk for recipe in tagged}
+        ])
+
+    def test_pulled_recipe_pushed_earlier_is_not_repeated(self):
+        pulled = Recipe.objects.filter(
+            author__feed_pull__isnull=False
+        ).first()
+        FeedItem.objects.create(
+            user=self.user, recipe=pulled, author=pulled.author,
+            created_at=pulled.created_at
+        )
+        ids, _ = self.collect(f'{FEED_URL}?limit=4')
+        self.assertEqual(ids, self.expected)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        # Версии и фрагменты рецептов уже в кэше.
+        self.client.get(f'{FEED_URL}?limit=20')
+        counts = []
+        for limit in (2, 10):
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(f'{FEED_URL}?limit={limit}')
+            counts.append(len(context))
+        self.assertEqual(counts[0], counts[1])
+
+
+class RebuildFeedsTests(FoodgramTestCase):
+    """Пересборка лент после загрузки данных в обход сигналов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [create_user(f'user{index}') for index in range(3)]
+        cls.author, cls.popular_author = create_user('a'), create_user('b')
+        cls.recipes = [create_recipe(cls.author) for _ in range(3)]
+        create_recipe(cls.popular_author)
+        Subscription.objects.bulk_create([
+            Subscription(user=user, author=cls.popular_author)
+            for user in cls.users
+        ] + [Subscription(user=cls.users[0], author=cls.author)])
+
+    @patch('recipes.feeds.FEED_BACKFILL_SIZE', 2)
+    @patch('recipes.feeds.FEED_PUSH_MAX_SUBSCRIBERS', 3)
+    def test_rebuild(self):
+        FeedItem.objects.create(
+            user=self.users[1], recipe=self.recipes[0], author=self.author,
+            created_at=self.recipes[0].created_at
+        )
+        with self.assertNumQueries(6):
+            rebuild_feeds()
+        self.assertTrue(
+            FeedPullAuthor.objects.filter(author=self.popular_author).exists()
+        )
+        self.assertEqual(
+            list(FeedItem.objects.order_by('-recipe_id').values_list(
+                'user', 'recipe', 'author', 'created_at'
+            )),
+            [
+                (
+                    self.users[0].pk, recipe.pk, self.author.pk,
+                    recipe.created_at
+                )
+                for recipe in self.recipes[:0:-1]
+            ]
+        )
@@ -0,0 +1,30 @@
+from django.core.cache import caches
+
+from recipes.cache import get_recipe_fragment_key
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+
+class RecipeFragmentTests(FoodgramTestCase):
+    """Фрагменты рецептов сбрасываются для всех процессов сразу."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = create_recipe(create_user('author'))
+
+    def setUp(self):
+        super().setUp()
+        # Отдельное подключение к кэшу, как у другого воркера.
+        self.other_cache = caches.create_connection('default')
+        self.key = get_recipe_fragment_key(self.recipe.pk)
+
+    def test_fragment_shared_and_invalidated_after_commit(self):
+        get_client().get('/api/recipes/')
+        self.assertIsNotNone(self.other_cache.get(self.key))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.name = 'Новое название'
+            self.recipe.save()
+            self.assertIsNotNone(self.other_cache.get(self.key))
+        self.assertIsNone(self.other_cache.get(self.key))
+        response = get_client().get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.data['name'], 'Новое название')
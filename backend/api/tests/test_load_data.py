@@ -0,0 +1,82 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+from recipes.management.commands.load_data import iter_json_array
+from recipes.models import Ingredient
+
+from .utils import FoodgramTestCase
+
+
+def parse(text, chunk_size=3):
+    return list(iter_json_array(io.StringIO(text), chunk_size))
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    """Потоковый разбор JSON-массива частями любого размера."""
+
+    def test_items(self):
+        items = [{'name': 'Соль', 'measurement_unit': 'г'}, 12345, 'x', None]
+        for text in (json.dumps(items), json.dumps(items, indent=4)):
+            for chunk_size in (1, 3, 1000):
+                self.assertEqual(parse(text, chunk_size), items)
+        self.assertEqual(parse(' [ ] '), [])
+
+    def test_separator_required(self):
+        for text in (
+            '[{"a": 1} {"b": 2}]',
+            '[1 2]',
+            '[1,]',
+            '[,1]',
+            '[1,,2]',
+            '[1 ,2 3]',
+        ):
+            with self.subTest(text=text):
+                with self.assertRaises(json.JSONDecodeError):
+                    parse(text)
+
+    def test_unfinished_array(self):
+        for text in ('', '{}', '[', '[1,', '[1, 2'):
+            with self.subTest(text=text):
+                with self.assertRaises(json.JSONDecodeError):
+                    parse(text)
+
+
+class LoadDataTests(FoodgramTestCase):
+    """Загрузка ингредиентов пропускает некорректные элементы."""
+
+    def load(self, content):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.json', encoding='utf-8', delete=False
+        ) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        stdout = io.StringIO()
+        call_command('load_data', file.name, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_non_object_items_are_invalid(self):
+        output = self.load(json.dumps([
+            {'name': 'Соль', 'measurement_unit': 'г'},
+            ['Перец', 'г'],
+            'Сахар',
+            None,
+        ]))
+        self.assertEqual(
+            list(Ingredient.objects.values_list('name', 'measurement_unit')),
+            [('Соль', 'г')]
+        )
+        self.assertIn(
+            'добавлено 1, пропущено 3 (из них некорректных 3)', output
+        )
+
+    def test_missing_comma(self):
+        with self.assertRaises(CommandError):
+            self.load(
+                '[{"name": "Соль", "measurement_unit": "г"} '
+                '{"name": "Сахар", "measurement_unit": "г"}]'
+            )
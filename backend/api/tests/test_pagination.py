@@ -0,0 +1,109 @@
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+
+class CursorPaginationTests(FoodgramTestCase):
+    """Курсорные страницы не теряют и не повторяют рецепты."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.recipes = [
+            create_recipe(cls.author, f'Рецепт {index}')
+            for index in range(25)
+        ]
+        # Так выглядят рецепты после массовой загрузки.
+        Recipe.objects.update(created_at=timezone.now())
+
+    def collect(self, url):
+        client = get_client()
+        ids = []
+        pages = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        return ids, pages
+
+    def test_pages_with_equal_created_at(self):
+        ids, pages = self.collect('/api/recipes/?cursor=&limit=4')
+        self.assertEqual(ids, sorted(
+            (recipe.pk for recipe in self.recipes), reverse=True
+        ))
+        self.assertEqual(len(pages), 7)
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_link_returns_previous_page(self):
+        client = get_client()
+        first = client.get('/api/recipes/?cursor=&limit=4').data
+        second = client.get(first['next']).data
+        previous = client.get(second['previous']).data
+        self.assertEqual(previous['results'], first['results'])
+        self.assertIsNone(previous['previous'])
+
+    def test_invalid_cursor(self):
+        response = get_client().get('/api/recipes/?cursor=invalid')
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_numbers_without_cursor(self):
+        response = get_client().get('/api/recipes/?limit=10&page=3')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class PopularCursorPaginationTests(CursorPaginationTests):
+    """Одинаковые счётчики избранного не повторяют страницы popular."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for index, recipe in enumerate(cls.recipes):
+            recipe.favorites_count = index % 3
+        Recipe.objects.bulk_update(cls.recipes, ['favorites_count'])
+
+    def test_pages_with_equal_created_at(self):
+        ids, pages = self.collect(
+            '/api/recipes/?ordering=popular&cursor=&limit=4'
+        )
+        self.assertEqual(ids, [recipe.pk for recipe in sorted(
+            self.recipes,
+            key=lambda recipe: (recipe.favorites_count, recipe.pk),
+            reverse=True
+        )])
+        self.assertEqual(len(pages), 7)
+
+    def test_previous_link_returns_previous_page(self):
+        client = get_client()
+        url = '/api/recipes/?ordering=popular&cursor=&limit=4'
+        first = client.get(url).data
+        second = client.get(first['next']).data
+        third = client.get(second['next']).data
+        previous = client.get(third['previous']).data
+        self.assertEqual(previous['results'], second['results'])
+
+
+class SearchCursorPaginationTests(FoodgramTestCase):
+    """Рецепты с одинаковой релевантностью не повторяются в поиске."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.recipes = [create_recipe(author, 'Борщ') for _ in range(9)]
+
+    def test_pages_with_equal_rank(self):
+        client = get_client()
+        url = '/api/recipes/?search=борщ&cursor=&limit=2'
+        ids = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, sorted(
+            (recipe.pk for recipe in self.recipes), reverse=True
+        ))
@@ -0,0 +1,109 @@
+import re
+import zlib
+from unittest.mock import patch
+
+from django.conf import settings
+
+from api.recipes.pdf import (PDF_LINES_PER_PAGE, TEXT_ENCODING,
+                             StreamingPDFWriter, TrueTypeFont)
+from recipes.models import Ingredient, IngredientInRecipe, ShoppingCart
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/?format=pdf'
+OBJECT_PATTERN = re.compile(rb'(\d+) 0 obj\n(.*?)\nendobj\n', re.DOTALL)
+STREAM_PATTERN = re.compile(
+    rb'<< (.*?) >>\nstream\n(.*)\nendstream', re.DOTALL
+)
+TEXT_PATTERN = re.compile(rb'\(((?:\\.|[^\\)])*)\) Tj')
+ESCAPE_PATTERN = re.compile(rb'\\(.)')
+
+
+def parse_pdf(content):
+    """
+    Разбирает PDF выгрузки: проверяет таблицу смещений
+    и возвращает тела объектов по номерам.
+    """
+    start = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', content)[1])
+    xref = content[start:].split(b'trailer')[0].splitlines()
+    offsets = [int(entry[:10]) for entry in xref[3:]]
+    objects = {}
+    for object_id, offset in enumerate(offsets, 1):
+        match = OBJECT_PATTERN.match(content, offset)
+        assert match and int(match[1]) == object_id, object_id
+        objects[object_id] = match[2]
+    return objects
+
+
+def get_stream(body):
+    dictionary, data = STREAM_PATTERN.match(body).groups()
+    assert b'/Length %d ' % len(data) in dictionary + b' '
+    if b'/FlateDecode' in dictionary:
+        data = zlib.decompress(data)
+    return dictionary, data
+
+
+class ShoppingListPDFTests(FoodgramTestCase):
+    """PDF списка покупок читается и содержит русский текст."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        recipe = create_recipe(create_user('author'))
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(name=f'Морковь {index}', measurement_unit='г')
+            for index in range(PDF_LINES_PER_PAGE)
+        ])
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=5)
+            for ingredient in ingredients
+        ])
+        ShoppingCart.objects.create(author=cls.user, recipe=recipe)
+
+    def test_pdf_structure_and_text(self):
+        response = get_client(self.user).get(DOWNLOAD_URL)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF-1.4\n'))
+        objects = parse_pdf(content)
+        pages = [
+            body for body in objects.values()
+            if body.startswith(b'<< /Type /Page ')
+        ]
+        self.assertEqual(len(pages), 2)
+        self.assertIn(b'/Count 2 ', next(
+            body for body in objects.values()
+            if body.startswith(b'<< /Type /Pages ')
+        ))
+        lines = [
+            ESCAPE_PATTERN.sub(rb'\1', text).decode(TEXT_ENCODING)
+            for body in objects.values()
+            if body.startswith(b'<< /Length ')
+            for text in TEXT_PATTERN.findall(get_stream(body)[1])
+        ]
+        self.assertEqual(lines[0], 'Список покупок:')
+        self.assertIn('- Морковь 0 (5 г)', lines)
+        self.assertEqual(len(lines), PDF_LINES_PER_PAGE + 2)
+        # Байт буквы С в cp1251 связан с именем её глифа.
+        self.assertIn(
+            b' %d /afii10035 ' % 'С'.encode(TEXT_ENCODING)[0],
+            next(
+                body for body in objects.values()
+                if body.startswith(b'<< /Type /Font ')
+            )
+        )
+        dictionary, font_data = get_stream(next(
+            body for body in objects.values() if b'/Length1 ' in body
+        ))
+        with open(settings.PDF_FONT_PATH, 'rb') as font_file:
+            self.assertEqual(font_data, font_file.read())
+        self.assertIn(b'/Length1 %d ' % len(font_data), dictionary)
+
+    def test_font_compressed_once(self):
+        font = TrueTypeFont(settings.PDF_FONT_PATH)
+        with patch(
+            'api.recipes.pdf.zlib.compress', wraps=zlib.compress
+        ) as compress:
+            for _ in range(2):
+                StreamingPDFWriter(font).start()
+        self.assertEqual(compress.call_count, 1)
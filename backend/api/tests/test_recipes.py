@@ -0,0 +1,151 @@
+import base64
+
+from api.recipes.serializers import CreateRecipeSerializer
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from users.models import Subscription
+
+from .utils import (PNG, FoodgramTestCase, create_recipe, create_user,
+                    get_client)
+
+RECIPES_URL = '/api/recipes/'
+
+
+class RecipeListQueriesTests(FoodgramTestCase):
+    """Страница рецептов стоит одинаковое число запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        for index in range(10):
+            author = create_user(f'author{index}')
+            recipe = create_recipe(author)
+            Favorite.objects.create(author=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(author=cls.user, recipe=recipe)
+            Subscription.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        super().setUp()
+        self.client = get_client(self.user)
+        # Версии данных и фрагменты рецептов уже в кэше.
+        self.client.get(f'{RECIPES_URL}?limit=10')
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        # Токен, две пачки версий, COUNT, рецепты с флагами и фрагменты.
+        for limit in (2, 10):
+            with self.assertNumQueries(6):
+                response = self.client.get(f'{RECIPES_URL}?limit={limit}')
+            self.assertEqual(len(response.data['results']), limit)
+            for recipe in response.data['results']:
+                self.assertTrue(recipe['is_favorited'])
+                self.assertTrue(recipe['is_in_shopping_cart'])
+                self.assertTrue(recipe['author']['is_subscribed'])
+
+
+class RecipeValidationQueriesTests(FoodgramTestCase):
+    """Ингредиенты и теги рецепта проверяются двумя запросами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = create_recipe(create_user('author'))
+        cls.ingredients = Ingredient.objects.bulk_create([
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(30)
+        ])
+        cls.tags = Tag.objects.bulk_create([
+            Tag(name=f'Тег {index}', slug=f'tag{index}') for index in range(3)
+        ])
+
+    def get_data(self, ingredients, tags):
+        return {
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 10}
+                for ingredient in ingredients
+            ],
+            'tags': [tag.pk for tag in tags],
+            'image': (
+                'data:image/png;base64,' + base64.b64encode(PNG).decode()
+            ),
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+        }
+
+    def test_query_count_does_not_depend_on_ingredient_count(self):
+        for ingredients, tags in (
+            (self.ingredients[:3], self.tags[:1]),
+            (self.ingredients, self.tags),
+        ):
+            for instance in (None, self.recipe):
+                serializer = CreateRecipeSerializer(
+                    instance, data=self.get_data(ingredients, tags)
+                )
+                with self.assertNumQueries(2):
+                    self.assertTrue(serializer.is_valid(), serializer.errors)
+                self.assertEqual(
+                    [
+                        item['ingredient']
+                        for item in serializer.validated_data['ingredients']
+                    ],
+                    list(ingredients)
+                )
+
+    def test_all_missing_ingredients_reported(self):
+        data = self.get_data(self.ingredients[:3], self.tags)
+        data['ingredients'][0]['id'] = data['ingredients'][2]['id'] = 10**9
+        serializer = CreateRecipeSerializer(data=data)
+        with self.assertNumQueries(2):
+            self.assertFalse(serializer.is_valid())
+        errors = serializer.errors['ingredients']
+        self.assertIn('id', errors[0])
+        self.assertEqual(errors[1], {})
+        self.assertIn('id', errors[2])
+
+
+class RecipeUpdateShoppingListTests(FoodgramTestCase):
+    """Изменение ингредиентов рецепта переносится в списки покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.user = create_user('user')
+        cls.tag = Tag.objects.create(name='Суп', slug='soup')
+        cls.removed, cls.kept = Ingredient.objects.bulk_create([
+            Ingredient(name='Морковь', measurement_unit='г'),
+            Ingredient(name='Лук', measurement_unit='г'),
+        ])
+        cls.recipe, other_recipe = (
+            create_recipe(cls.author), create_recipe(cls.author)
+        )
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(
+                recipe=cls.recipe, ingredient=cls.removed, amount=10
+            ),
+            IngredientInRecipe(
+                recipe=cls.recipe, ingredient=cls.kept, amount=5
+            ),
+            IngredientInRecipe(
+                recipe=other_recipe, ingredient=cls.removed, amount=7
+            ),
+        ])
+        for recipe in (cls.recipe, other_recipe):
+            ShoppingCart.objects.create(author=cls.user, recipe=recipe)
+
+    def get_amount(self, ingredient):
+        return ShoppingListItem.objects.get(
+            user=self.user, ingredient=ingredient
+        ).total_amount
+
+    def test_removed_ingredient_subtracted_once(self):
+        self.assertEqual(self.get_amount(self.removed), 17)
+        response = get_client(self.author).patch(
+            f'{RECIPES_URL}{self.recipe.pk}/',
+            {
+                'ingredients': [{'id': self.kept.pk, 'amount': 8}],
+                'tags': [self.tag.pk],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_amount(self.removed), 7)
+        self.assertEqual(self.get_amount(self.kept), 8)
@@ -0,0 +1,60 @@
+from recipes.models import Favorite
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+BULK_FAVORITES_URL = '/api/recipes/favorite/bulk/'
+MISSING_RECIPE_ID = 10 ** 9
+
+
+class BulkFavoritesTests(FoodgramTestCase):
+    """Массовые операции ведут счётчики так же, как одиночные."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        author = create_user('author')
+        cls.recipes = [create_recipe(author) for _ in range(3)]
+
+    def setUp(self):
+        super().setUp()
+        self.client = get_client(self.user)
+
+    def get_counters(self):
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+        return [recipe.favorites_count for recipe in self.recipes]
+
+    def test_bulk_add_and_remove(self):
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        self.client.post(f'/api/recipes/{first}/favorite/')
+        response = self.client.post(
+            BULK_FAVORITES_URL,
+            {'recipes': [first, second, MISSING_RECIPE_ID]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'id': first, 'status': 'exists'},
+            {'id': second, 'status': 'added'},
+            {'id': MISSING_RECIPE_ID, 'status': 'not_found'},
+        ])
+        self.assertEqual(self.get_counters(), [1, 1, 0])
+        response = self.client.delete(
+            BULK_FAVORITES_URL, {'recipes': [first, third]}, format='json'
+        )
+        self.assertEqual(response.data['results'], [
+            {'id': first, 'status': 'removed'},
+            {'id': third, 'status': 'absent'},
+        ])
+        self.assertEqual(self.get_counters(), [0, 1, 0])
+        self.assertEqual(
+            list(Favorite.objects.values_list('recipe_id', flat=True)),
+            [second]
+        )
+
+    def test_repeated_add_keeps_counter(self):
+        recipe_id = self.recipes[0].pk
+        for _ in range(2):
+            self.client.post(
+                BULK_FAVORITES_URL, {'recipes': [recipe_id]}, format='json'
+            )
+        self.assertEqual(self.get_counters(), [1, 0, 0])
@@ -0,0 +1,97 @@
+import random
+
+from django.test import SimpleTestCase
+
+from shortener.models import UrlMap
+from shortener.services import (BASE, DICTIONARY, MAX_CODE_LENGTH,
+                                MIN_CODE_LENGTH, decode_short_code,
+                                encode_recipe_id)
+from shortener.views import find_url_map
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+LARGE_RECIPE_IDS = (
+    BASE ** MIN_CODE_LENGTH - 1, BASE ** MIN_CODE_LENGTH,
+    10 ** 12, 2 ** 63 - 1,
+)
+
+
+class ShortCodeTests(SimpleTestCase):
+    """Код рецепта однозначно обращается в его id."""
+
+    def test_round_trip(self):
+        codes = set()
+        for recipe_id in range(1, 20001):
+            code = encode_recipe_id(recipe_id)
+            self.assertEqual(len(code), MIN_CODE_LENGTH)
+            self.assertEqual(decode_short_code(code), recipe_id)
+            codes.add(code)
+        self.assertEqual(len(codes), 20000)
+
+    def test_large_ids(self):
+        for recipe_id in LARGE_RECIPE_IDS:
+            code = encode_recipe_id(recipe_id)
+            self.assertLessEqual(len(code), MAX_CODE_LENGTH)
+            self.assertEqual(decode_short_code(code), recipe_id)
+        self.assertEqual(
+            len(encode_recipe_id(BASE ** MIN_CODE_LENGTH)),
+            MIN_CODE_LENGTH + 1
+        )
+
+    def test_decoded_codes_are_canonical(self):
+        # Любой код либо не обращается, либо совпадает
+        # с кодом найденного рецепта.
+        generator = random.Random(0)
+        for length in range(MIN_CODE_LENGTH, MIN_CODE_LENGTH + 3):
+            for _ in range(2000):
+                code = ''.join(generator.choices(DICTIONARY, k=length))
+                recipe_id = decode_short_code(code)
+                if recipe_id is not None:
+                    self.assertEqual(encode_recipe_id(recipe_id), code)
+
+    def test_invalid_codes(self):
+        for code in (
+            '', 'abc', 'abl1', 'ab-d', 'A' * (MAX_CODE_LENGTH + 1)
+        ):
+            with self.subTest(code=code):
+                self.assertIsNone(decode_short_code(code))
+
+
+class ShortLinkRedirectTests(FoodgramTestCase):
+    """Короткие ссылки ведут на рецепт, старые коды - через UrlMap."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.recipe = create_recipe(author)
+        cls.legacy_recipe = create_recipe(author)
+        UrlMap.objects.create(
+            recipe=cls.legacy_recipe,
+            full_url=f'/recipes/{cls.legacy_recipe.pk}/',
+            short_code='aB3',
+            short_url='http://foodgram.ru/s/aB3/',
+        )
+
+    def setUp(self):
+        super().setUp()
+        find_url_map.cache_clear()
+        self.client = get_client()
+
+    def test_redirect(self):
+        response = self.client.get(
+            f'/s/{encode_recipe_id(self.recipe.pk)}/'
+        )
+        self.assertRedirects(
+            response, f'/recipes/{self.recipe.pk}/',
+            fetch_redirect_response=False
+        )
+
+    def test_legacy_code(self):
+        response = self.client.get('/s/aB3/')
+        self.assertRedirects(
+            response, f'/recipes/{self.legacy_recipe.pk}/',
+            fetch_redirect_response=False
+        )
+
+    def test_unknown_legacy_code(self):
+        self.assertEqual(self.client.get('/s/xY4/').status_code, 404)
@@ -0,0 +1,45 @@
+from recipes.models import Ingredient, Tag
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+
+class VersionedSnapshotTests(FoodgramTestCase):
+    """Снимки тегов и ингредиентов обновляются после записи."""
+
+    def test_new_tag_slug_is_accepted(self):
+        client = get_client()
+        response = client.get('/api/recipes/?tags=soup')
+        self.assertEqual(response.status_code, 400)
+        with self.captureOnCommitCallbacks(execute=True):
+            tag = Tag.objects.create(name='Суп', slug='soup')
+        recipe = create_recipe(create_user('author'))
+        recipe.tags.add(tag)
+        response = client.get('/api/recipes/?tags=soup')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.data['results']], [recipe.pk]
+        )
+
+    def test_new_ingredient_is_found(self):
+        client = get_client()
+        self.assertEqual(client.get('/api/ingredients/?name=ёж').data, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient = Ingredient.objects.create(
+                name='Ежевика', measurement_unit='г'
+            )
+        self.assertEqual(
+            [item['id'] for item in client.get(
+                '/api/ingredients/?name=ёж'
+            ).data],
+            [ingredient.pk]
+        )
+
+    def test_tag_created_without_version_bump(self):
+        client = get_client()
+        client.get('/api/recipes/?tags=salad')
+        # Версия тегов не меняется: обработчик фиксации не запускается.
+        Tag.objects.create(name='Салат', slug='salad')
+        response = client.get('/api/recipes/?tags=salad')
+        self.assertEqual(response.status_code, 200)
+        response = client.get('/api/recipes/?tags=unknown')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from recipes.models import Favorite, TrendingRecipe
+from recipes.trending import TRENDING_COMMIT_LAG, update_trending
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+
+class TrendingTests(FoodgramTestCase):
+    """Каждое событие попадает в рейтинг ровно один раз."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.recipe = create_recipe(create_user('author'))
+
+    def add_favorite(self, created_at, user=None):
+        favorite = Favorite.objects.create(
+            author=user or self.user, recipe=self.recipe
+        )
+        Favorite.objects.filter(pk=favorite.pk).update(created_at=created_at)
+
+    def get_score(self):
+        return TrendingRecipe.objects.get(recipe=self.recipe).score
+
+    def test_late_commit_is_counted_once(self):
+        now = timezone.now()
+        self.add_favorite(now - TRENDING_COMMIT_LAG * 2, create_user('other'))
+        update_trending(now)
+        score = self.get_score()
+        # Событие вставлено до запуска, но зафиксировано после него.
+        self.add_favorite(now - timedelta(seconds=1))
+        later = now + TRENDING_COMMIT_LAG
+        self.assertEqual(update_trending(later), 1)
+        self.assertGreater(self.get_score(), score)
+        score = self.get_score()
+        self.assertEqual(update_trending(later), 0)
+        self.assertEqual(self.get_score(), score)
+
+    def test_watermark_survives_pruned_ratings(self):
+        now = timezone.now()
+        self.add_favorite(now - TRENDING_COMMIT_LAG * 2)
+        self.assertEqual(update_trending(now), 1)
+        TrendingRecipe.objects.all().delete()
+        self.assertEqual(update_trending(now + TRENDING_COMMIT_LAG), 0)
+        self.assertFalse(TrendingRecipe.objects.exists())
+
+    def test_trending_endpoint(self):
+        now = timezone.now()
+        self.add_favorite(now - TRENDING_COMMIT_LAG * 2)
+        update_trending(now)
+        response = get_client().get('/api/recipes/trending/')
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipe.pk]
+        )
@@ -0,0 +1,75 @@
+from recipes.models import Recipe
+from users.models import Subscription
+
+from .utils import FoodgramTestCase, create_recipe, create_user, get_client
+
+USERS_URL = '/api/users/'
+SUBSCRIPTIONS_URL = '/api/users/subscriptions/'
+
+
+class SubscriptionListQueriesTests(FoodgramTestCase):
+    """Страница подписок стоит одинаковое число запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        for index in range(10):
+            author = create_user(f'author{index}')
+            for _ in range(3):
+                create_recipe(author)
+            Subscription.objects.create(user=cls.user, author=author)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        client = get_client(self.user)
+        # Токен, подсчёт, авторы с числом рецептов и рецепты авторов.
+        for limit in (2, 10):
+            with self.assertNumQueries(4):
+                response = client.get(
+                    f'{SUBSCRIPTIONS_URL}?limit={limit}&recipes_limit=2'
+                )
+            self.assertEqual(len(response.data['results']), limit)
+            for author in response.data['results']:
+                latest = Recipe.objects.filter(
+                    author_id=author['id']
+                ).order_by('-created_at', '-id').values_list('id', flat=True)
+                self.assertTrue(author['is_subscribed'])
+                self.assertEqual(author['recipes_count'], 3)
+                self.assertEqual(
+                    [recipe['id'] for recipe in author['recipes']],
+                    list(latest[:2])
+                )
+
+
+class UserListQueriesTests(FoodgramTestCase):
+    """Страница пользователей стоит одинаковое число запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.authors = [create_user(f'author{index}') for index in range(10)]
+        Subscription.objects.bulk_create([
+            Subscription(user=cls.user, author=author)
+            for author in cls.authors[::2]
+        ])
+        cls.subscribed_ids = {author.pk for author in cls.authors[::2]}
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        client = get_client(self.user)
+        # Токен, подсчёт и пользователи с флагом подписки.
+        for limit in (2, 10):
+            with self.assertNumQueries(3):
+                response = client.get(f'{USERS_URL}?limit={limit}')
+            self.assertEqual(len(response.data['results']), limit)
+            for user in response.data['results']:
+                self.assertEqual(
+                    user['is_subscribed'], user['id'] in self.subscribed_ids
+                )
+
+    def test_anonymous_query_count(self):
+        for limit in (2, 10):
+            with self.assertNumQueries(2):
+                response = get_client().get(f'{USERS_URL}?limit={limit}')
+            self.assertEqual(len(response.data['results']), limit)
+            self.assertFalse(any(
+                user['is_subscribed'] for user in response.data['results']
+            ))
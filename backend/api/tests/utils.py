@@ -0,0 +1,59 @@
+import base64
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from recipes.models import Recipe
+from users.models import FoodgramUser
+
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAC'
+    'hwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+def create_user(username):
+    return FoodgramUser.objects.create_user(
+        username=username, email=f'{username}@foodgram.ru', password='pass',
+        first_name=username, last_name=username
+    )
+
+
+def create_recipe(author, name='Рецепт', **fields):
+    return Recipe.objects.create(
+        author=author, name=name, text='Описание', cooking_time=10,
+        image=ContentFile(PNG, name='recipe.png'), **fields
+    )
+
+
+def get_client(user=None):
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+class FoodgramTestCase(APITestCase):
+    """Изолирует кэш и загружаемые файлы каждого теста."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
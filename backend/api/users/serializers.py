@@ -1,8 +1,9 @@
 from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
+from rest_framework.settings import api_settings
 
+from recipes.relations import subscribe
 from users.models import Subscription
 
 from ..fields import Base64ImageField
@@ -38,6 +39,8 @@ class FoodgramUserSerializer(UserSerializer):
     def get_is_subscribed(self, obj):
 
         """Проверяет подписку текущего пользователя."""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         return (
             user.is_authenticated
@@ -56,9 +59,7 @@ class AvatarSerializer(serializers.ModelSerializer):
 
 class UserRecipeSerializer(FoodgramUserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        read_only=True, source='recipes.count'
-    )
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -76,6 +77,8 @@ class UserRecipeSerializer(FoodgramUserSerializer):
 
     def get_recipes(self, obj):
         from api.recipes.serializers import ShortRecipeSerializer
+        if hasattr(obj, 'recipes_preview'):
+            return ShortRecipeSerializer(obj.recipes_preview, many=True).data
         request = self.context['request']
         recipes = obj.recipes.all()
         recipes_limit = request.query_params.get('recipes_limit')
@@ -85,6 +88,11 @@ class UserRecipeSerializer(FoodgramUserSerializer):
             recipes = recipes[:int(recipes_limit)]
         return ShortRecipeSerializer(recipes, many=True).data
 
+    def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return obj.recipes.count()
+
 
 class SubscriptionSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(
@@ -97,13 +105,8 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
         fields = ('author', 'user')
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Subscription.objects.all(),
-                fields=('author', 'user'),
-                message='Вы уже подписаны на этого пользователя.',
-            )
-        ]
+        # Повторная подписка отсекается самой вставкой в create().
+        validators = []
 
     def validate_author(self, author):
         """Запрещает подписываться на самого себя."""
@@ -113,5 +116,14 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             )
         return author
 
+    def create(self, validated_data):
+        if not subscribe(validated_data['user'], validated_data['author']):
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Вы уже подписаны на этого пользователя.'
+                ]
+            })
+        return Subscription(**validated_data)
+
     def to_representation(self, instance):
         return UserRecipeSerializer(instance.author, context=self.context).data
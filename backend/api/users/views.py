@@ -7,26 +7,37 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from recipes.models import Recipe
+from recipes.relations import unsubscribe
+from users.models import Subscription
+
+from ..metrics import ServerTimingMixin
 from ..pagination import FoodgramPagination
-from .serializers import AvatarSerializer, SubscriptionSerializer
+from ..recipes.services import annotate_user_flags
+from .serializers import (AvatarSerializer, SubscriptionSerializer,
+                          UserRecipeSerializer)
 
 User = get_user_model()
 
 
-class FoodgramUserViewSet(UserViewSet):
+class FoodgramUserViewSet(ServerTimingMixin, UserViewSet):
 
     pagination_class = FoodgramPagination
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_authenticated:
-            return super().get_queryset().prefetch_related(
-                models.Prefetch(
-                    'subscribers',
-                    queryset=user.subscribers.all()
-                )
-            )
-        return User.objects.all()
+        return annotate_user_flags(
+            super().get_queryset(), user,
+            is_subscribed=Subscription.objects.filter(
+                author=models.OuterRef('pk'), user=user.pk
+            ),
+        )
+
+    def get_instance(self):
+        user = super().get_instance()
+        # Подписка на самого себя запрещена, запрос не нужен.
+        user.is_subscribed = False
+        return user
 
     @action(
         detail=False, methods=['get'], permission_classes=[IsAuthenticated]
@@ -64,16 +75,39 @@ class FoodgramUserViewSet(UserViewSet):
         url_path='subscriptions'
     )
     def list_subscriptions(self, request):
-        """Список подписок текущего пользователя."""
-        subscriptions = request.user.subscriptions.select_related('author')
-        page = self.paginate_queryset(subscriptions)
+        """
+        Список подписок текущего пользователя.
+        Страница собирается тремя запросами: подсчёт, авторы с числом
+        рецептов и первые recipes_limit рецептов всех авторов страницы.
+        """
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'cooking_time', 'author'
+        ).order_by('-created_at', '-id')
+        recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            # Срез в Prefetch выполняется одним запросом
+            # с ROW_NUMBER() OVER (PARTITION BY author_id).
+            recipes = recipes[:int(recipes_limit)]
+        authors = User.objects.filter(
+            subscribers__user=request.user
+        ).annotate(
+            recipes_count=models.Count('recipes'),
+            is_subscribed=models.Value(
+                True, output_field=models.BooleanField()
+            ),
+        ).prefetch_related(
+            models.Prefetch(
+                'recipes', queryset=recipes, to_attr='recipes_preview'
+            )
+        ).order_by('username', 'id')
+        page = self.paginate_queryset(authors)
         if page is not None:
-            serializer = SubscriptionSerializer(
+            serializer = UserRecipeSerializer(
                 page, many=True, context={'request': request}
             )
             return self.get_paginated_response(serializer.data)
-        serializer = SubscriptionSerializer(
-            subscriptions, many=True, context={'request': request}
+        serializer = UserRecipeSerializer(
+            authors, many=True, context={'request': request}
         )
         return Response(serializer.data)
 
@@ -95,14 +129,11 @@ class FoodgramUserViewSet(UserViewSet):
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, id=None):
-        author = get_object_or_404(User, id=id)
-        subscription = request.user.subscriptions.select_related(
-            'author'
-        ).filter(author=author).first()
-        if not subscription:
-            return Response(
-                {'detail': 'Вы не подписаны на этого пользователя.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        subscription.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        if unsubscribe(request.user, id):
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        # Автор проверяется, только если отписываться было не от чего.
+        get_object_or_404(User, id=id)
+        return Response(
+            {'detail': 'Вы не подписаны на этого пользователя.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
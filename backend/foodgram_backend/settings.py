@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_extensions',
     'django_filters',
     'djoser',
@@ -33,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -73,6 +75,37 @@ DATABASES = {
     }
 }
 
+# Кэш должен быть общим для всех процессов: воркеров API, сервиса
+# событий и management-команд. Через него расходятся версии данных
+# для ETag, инвалидация фрагментов рецептов и билеты SSE.
+# По умолчанию кэш хранится в таблице Postgres (createcachetable),
+# при необходимости заменяется на Redis или Memcached.
+CACHE_BACKEND = config(
+    'CACHE_BACKEND', default='recipes.cache_backends.PostgresCache'
+)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default='django_cache'),
+    }
+}
+if CACHE_BACKEND == 'recipes.cache_backends.PostgresCache':
+    # Фрагменты есть у каждого рецепта, стандартные 300 записей
+    # вытеснялись бы постоянно.
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=100000, cast=int)
+    }
+
+# Шина событий SSE: memory - в пределах процесса,
+# postgres - LISTEN/NOTIFY для нескольких воркеров.
+EVENTS_BACKEND = config('EVENTS_BACKEND', default='memory')
+
+# TrueType-шрифт с кириллицей, встраиваемый в PDF-выгрузки.
+PDF_FONT_PATH = config(
+    'PDF_FONT_PATH',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -1,8 +1,16 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from api.events import EventTicketView, events_view
+from api.metrics import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    path('api/events/', events_view, name='events'),
+    path(
+        'api/events/ticket/', EventTicketView.as_view(), name='events-ticket'
+    ),
     path('api/', include('api.users.urls', namespace='users')),
     path('api/', include('api.recipes.urls', namespace='recipes')),
     path('', include('shortener.urls', namespace='shortener'))
@@ -19,6 +19,9 @@ class AuthorRecipeModel(AuthorModel):
     recipe = models.ForeignKey(
         'recipes.Recipe', on_delete=models.CASCADE, verbose_name='Рецепт'
     )
+    created_at = models.DateTimeField(
+        'Добавлено', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         abstract = True
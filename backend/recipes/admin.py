@@ -1,5 +1,4 @@
 from django.contrib import admin
-from django.db.models import Count
 
 from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
                      ShoppingCart, Tag)
@@ -28,24 +27,12 @@ class IngredientInRecipeInline(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'favorites_count')
+    list_display = ('name', 'author', 'favorites_count', 'in_carts_count')
     search_fields = ('name', 'author__username')
     list_filter = ('tags',)
+    list_select_related = ('author',)
     inlines = (IngredientInRecipeInline,)
-    readonly_fields = ('favorites_count',)
-
-    def get_queryset(self, request):
-        """
-        Оптимизация запросов с предварительным подсчётом кол-ва избранных.
-        """
-        queryset = super().get_queryset(request)
-        return queryset.annotate(favorites_count=Count('favorites'))
-
-    def favorites_count(self, obj):
-        """Общее число добавлений рецепта в избранное."""
-        return obj.favorites_count
-
-    favorites_count.short_description = 'В избранном'
+    readonly_fields = ('favorites_count', 'in_carts_count')
 
 
 @admin.register(Favorite)
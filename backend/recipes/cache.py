@@ -0,0 +1,95 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+RECIPE_FRAGMENT_KEY = 'recipe-fragment:{}'
+# Фрагменты инвалидируются сигналами, таймаут лишь страхует от мусора.
+RECIPE_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+DATA_VERSION_KEY = 'data-version:{}'
+TAGS_VERSION = 'tags'
+INGREDIENTS_VERSION = 'ingredients'
+RECIPES_VERSION = 'recipes'
+# Меняется вместе со счётчиками избранного и списков покупок.
+POPULARITY_VERSION = 'popularity'
+USER_STATE_VERSION = 'user-state:{}'
+
+
+def get_recipe_fragment_key(recipe_id):
+    """Ключ кэша с независимой от пользователя частью рецепта."""
+    return RECIPE_FRAGMENT_KEY.format(recipe_id)
+
+
+def invalidate_recipe_fragments(recipe_ids):
+    """
+    Удаляет из кэша фрагменты указанных рецептов после фиксации
+    текущей транзакции: иначе читатель успел бы положить в кэш
+    прежний фрагмент до фиксации, и тот жил бы до таймаута.
+    """
+    keys = [get_recipe_fragment_key(recipe_id) for recipe_id in recipe_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_user_state_version_name(user_id):
+    """Версия избранного, корзины и подписок пользователя."""
+    return USER_STATE_VERSION.format(user_id)
+
+
+def get_data_versions(*names):
+    """
+    Возвращает версии данных - время их последнего изменения.
+    Отсутствующая в кэше версия считается изменённой только что.
+    """
+    keys = {DATA_VERSION_KEY.format(name): name for name in names}
+    versions = cache.get_many(keys)
+    now = time.time()
+    for key in keys.keys() - versions.keys():
+        cache.add(key, now, None)
+        versions[key] = cache.get(key, now)
+    return [versions[key] for key in keys]
+
+
+def bump_data_version(name):
+    """
+    Отмечает изменение данных после фиксации текущей транзакции.
+    Иначе параллельный GET связал бы новый ETag с прежними данными,
+    и клиенты получали бы 304 на устаревший ответ до следующей записи.
+    """
+    transaction.on_commit(
+        lambda: cache.set(DATA_VERSION_KEY.format(name), time.time(), None)
+    )
+
+
+class VersionedSnapshot:
+    """
+    Данные в памяти процесса, которые перестраиваются методом build,
+    когда меняется версия данных version_name. Версии хранятся в кэше,
+    поэтому воркеры видят изменения друг друга только с общим кэшем.
+    """
+    version_name = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def build(self):
+        raise NotImplementedError
+
+    def get(self):
+        [version] = get_data_versions(self.version_name)
+        snapshot = self._snapshot
+        if snapshot is None or snapshot[0] != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot[0] != version:
+                    snapshot = self._snapshot = (version, self.build())
+        return snapshot[1]
+
+    def refresh(self):
+        """Перестраивает данные, не дожидаясь смены версии."""
+        [version] = get_data_versions(self.version_name)
+        with self._lock:
+            self._snapshot = (version, self.build())
+            return self._snapshot[1]
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Кэши, которые не видны другим процессам.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Версии данных, фрагменты рецептов и билеты потока событий
+    хранятся в кэше. С локальным кэшем процесса воркер не узнает
+    об изменениях в другом воркере: например, после создания тега
+    его слаг в фильтре отклоняется с ответом 400.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f'Кэш {backend} не общий для воркеров.',
+        hint=(
+            'При запуске в несколько процессов задайте CACHE_BACKEND '
+            'и CACHE_LOCATION общего кэша, например Redis или Memcached.'
+        ),
+        id='recipes.W001',
+    )]
@@ -10,3 +10,6 @@ UNIT_MAX_LENGTH = 64
 
 # str
 RECIPE_IMAGE_DIR = 'recipes/images/'
+# Конфигурация полнотекстового поиска, та же, что в триггере
+# миграции 0008_recipe_search.
+RECIPE_SEARCH_CONFIG = 'russian'
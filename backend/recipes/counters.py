@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .cache import (POPULARITY_VERSION, RECIPES_VERSION, bump_data_version,
+                    invalidate_recipe_fragments)
+from .models import Favorite, Recipe, ShoppingCart
+
+# Поле счётчика рецепта для каждой модели связи.
+COUNTER_FIELDS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+def change_counter(model, recipe_id, delta):
+    """Атомарно изменяет счётчик рецепта выражением F()."""
+    change_counters(model, [recipe_id], delta)
+
+
+def change_counters(model, recipe_ids, delta):
+    """Изменяет счётчики нескольких рецептов одним UPDATE."""
+    field = COUNTER_FIELDS[model]
+    recipes = Recipe.objects.filter(pk__in=recipe_ids)
+    if delta < 0:
+        # Счётчик мог разойтись с данными, отрицательным он стать не должен.
+        recipes = recipes.filter(**{f'{field}__gte': -delta})
+    recipes.update(**{field: F(field) + delta})
+
+
+def count_subquery(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(recipe=OuterRef('pk'))
+            .order_by().values('recipe')
+            .annotate(total=Count('pk')).values('total')
+        ),
+        Value(0)
+    )
+
+
+@transaction.atomic
+def reconcile_counters():
+    """
+    Пересчитывает счётчики рецептов, разошедшиеся с данными,
+    и сбрасывает версии и фрагменты исправленных рецептов.
+    Возвращает количество исправленных рецептов.
+    """
+    actual = {
+        field: count_subquery(model) for model, field in COUNTER_FIELDS.items()
+    }
+    drifted = Recipe.objects.annotate(**{
+        f'actual_{field}': expression for field, expression in actual.items()
+    }).filter(
+        Q(*(
+            ~Q(**{field: F(f'actual_{field}')}) for field in actual
+        ), _connector=Q.OR)
+    )
+    recipe_ids = list(drifted.values_list('pk', flat=True))
+    if not recipe_ids:
+        return 0
+    fixed = Recipe.objects.filter(pk__in=recipe_ids).update(**actual)
+    invalidate_recipe_fragments(recipe_ids)
+    bump_data_version(RECIPES_VERSION)
+    bump_data_version(POPULARITY_VERSION)
+    return fixed
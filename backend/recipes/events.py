@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+from .models import Favorite, ShoppingCart
+
+logger = logging.getLogger(__name__)
+
+USER_CHANNEL = 'user:{}'
+AUTHOR_CHANNEL = 'author:{}'
+# Канал Postgres, через который воркеры обмениваются событиями.
+NOTIFY_CHANNEL = 'foodgram_events'
+# События сверх этого числа в очереди соединения вытесняют старые.
+LISTENER_QUEUE_SIZE = 100
+LISTEN_POLL_TIMEOUT = 5
+LISTEN_RECONNECT_DELAY = 1
+RECIPE_EVENT_TYPES = {
+    Favorite: 'favorite',
+    ShoppingCart: 'shopping_cart',
+}
+
+
+def get_user_channel(user_id):
+    """Изменения корзины, избранного и подписок пользователя."""
+    return USER_CHANNEL.format(user_id)
+
+
+def get_author_channel(author_id):
+    """Новые рецепты автора."""
+    return AUTHOR_CHANNEL.format(author_id)
+
+
+class Listener:
+    """
+    Очередь событий одного соединения.
+    Живёт в цикле событий соединения, наполняется из любых потоков.
+    """
+
+    def __init__(self, bus, channels):
+        self.bus = bus
+        self.channels = set()
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(LISTENER_QUEUE_SIZE)
+        for channel in channels:
+            self.add(channel)
+
+    def add(self, channel):
+        self.channels.add(channel)
+        self.bus.add_listener(channel, self)
+
+    def discard(self, channel):
+        self.channels.discard(channel)
+        self.bus.remove_listener(channel, self)
+
+    def close(self):
+        for channel in tuple(self.channels):
+            self.discard(channel)
+
+    def put(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Цикл соединения уже закрыт, слушатель вот-вот отпишется.
+            pass
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+
+class EventBus:
+    """
+    Шина событий в памяти процесса: канал -> слушатели.
+    Простаивающее соединение стоит одну очередь и одну корутину.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = defaultdict(set)
+
+    def listen(self, channels):
+        return Listener(self, channels)
+
+    def add_listener(self, channel, listener):
+        with self._lock:
+            self._listeners[channel].add(listener)
+
+    def remove_listener(self, channel, listener):
+        with self._lock:
+            listeners = self._listeners.get(channel)
+            if listeners is not None:
+                listeners.discard(listener)
+                if not listeners:
+                    del self._listeners[channel]
+
+    def dispatch(self, channel, event):
+        with self._lock:
+            listeners = tuple(self._listeners.get(channel, ()))
+        for listener in listeners:
+            listener.put(event)
+
+
+event_bus = EventBus()
+
+
+class MemoryBackend:
+    """События видны только соединениям этого процесса."""
+
+    def start(self):
+        pass
+
+    def publish(self, channel, event):
+        event_bus.dispatch(channel, event)
+
+
+class PostgresBackend:
+    """
+    События рассылаются через NOTIFY, каждый воркер получает их
+    в отдельном потоке с LISTEN и раздаёт своим соединениям.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Поток слушателя запускается при первом SSE-соединении."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._listen_forever, name='event-listener',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def publish(self, channel, event):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, %s)',
+                [NOTIFY_CHANNEL, json.dumps([channel, event])]
+            )
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Event listener failed, reconnecting')
+                time.sleep(LISTEN_RECONNECT_DELAY)
+
+    def _listen(self):
+        wrapper = connections['default']
+        db = wrapper.Database.connect(**wrapper.get_connection_params())
+        try:
+            db.autocommit = True
+            with db.cursor() as cursor:
+                cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+            while True:
+                if select.select([db], [], [], LISTEN_POLL_TIMEOUT)[0]:
+                    db.poll()
+                    while db.notifies:
+                        notify = db.notifies.pop(0)
+                        event_bus.dispatch(*json.loads(notify.payload))
+        finally:
+            db.close()
+
+
+EVENT_BACKENDS = {
+    'memory': MemoryBackend,
+    'postgres': PostgresBackend,
+}
+event_backend = EVENT_BACKENDS[settings.EVENTS_BACKEND]()
+
+
+def publish(channel, event_type, **data):
+    """Публикует событие после фиксации текущей транзакции."""
+    event = {'type': event_type, **data}
+    transaction.on_commit(lambda: event_backend.publish(channel, event))
+
+
+def publish_recipes_changed(model, user_id, recipe_ids, added):
+    """Рецепты добавлены в избранное или корзину либо убраны оттуда."""
+    publish(
+        get_user_channel(user_id), RECIPE_EVENT_TYPES[model],
+        action='added' if added else 'removed', recipes=list(recipe_ids)
+    )
+
+
+def publish_subscription_changed(user_id, author_id, added):
+    publish(
+        get_user_channel(user_id), 'subscription',
+        action='added' if added else 'removed', author=author_id
+    )
+
+
+def publish_recipe_created(recipe):
+    publish(
+        get_author_channel(recipe.author_id), 'recipe',
+        id=recipe.pk, author=recipe.author_id
+    )
@@ -0,0 +1,146 @@
+from django.db import connection, transaction
+from django.db.models import Count
+
+from users.models import Subscription
+
+from .models import FeedItem, FeedPullAuthor, Recipe
+
+# Рецепты авторов, у которых подписчиков не меньше этого числа,
+# не рассылаются по лентам, а подмешиваются при чтении.
+FEED_PUSH_MAX_SUBSCRIBERS = 10_000
+# Сколько последних рецептов автора попадает в ленту при подписке.
+FEED_BACKFILL_SIZE = 100
+FEED_BATCH_SIZE = 5000
+
+
+@transaction.atomic
+def push_recipe(recipe):
+    """Рассылает новый рецепт по лентам подписчиков автора."""
+    if FeedPullAuthor.objects.filter(author_id=recipe.author_id).exists():
+        return
+    subscriber_ids = list(
+        Subscription.objects.filter(author_id=recipe.author_id)
+        .values_list('user_id', flat=True)[:FEED_PUSH_MAX_SUBSCRIBERS]
+    )
+    if len(subscriber_ids) >= FEED_PUSH_MAX_SUBSCRIBERS:
+        # Автор остаётся в режиме чтения навсегда, поэтому рецепты,
+        # разосланные раньше, и новые рецепты не теряются на переходе.
+        FeedPullAuthor.objects.bulk_create(
+            [FeedPullAuthor(author_id=recipe.author_id)],
+            ignore_conflicts=True
+        )
+        return
+    FeedItem.objects.bulk_create(
+        (
+            FeedItem(
+                user_id=user_id, recipe_id=recipe.pk,
+                author_id=recipe.author_id, created_at=recipe.created_at
+            )
+            for user_id in subscriber_ids
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def push_recipe_on_commit(recipe):
+    """
+    Откладывает рассылку до фиксации транзакции создания рецепта:
+    тысячи вставок в ленты не удерживают её блокировки, а откат
+    создания не оставляет строк в лентах.
+    """
+    transaction.on_commit(lambda: push_recipe(recipe))
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    if FeedPullAuthor.objects.filter(author_id=author_id).exists():
+        return
+    FeedItem.objects.bulk_create(
+        (
+            FeedItem(
+                user_id=user_id, recipe_id=recipe_id, author_id=author_id,
+                created_at=created_at
+            )
+            for recipe_id, created_at in Recipe.objects.filter(
+                author_id=author_id
+            ).values_list('pk', 'created_at')[:FEED_BACKFILL_SIZE]
+        ),
+        ignore_conflicts=True
+    )
+
+
+def prune_feed(user_id, author_id):
+    """Убирает из ленты рецепты автора после отписки."""
+    FeedItem.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def get_feed_sources(user, recipes):
+    """
+    Источники ленты пользователя для чтения по ключу (created_at, id):
+    строки ленты по индексу (user, -created_at) и рецепты каждого
+    автора без рассылки, на которого он подписан, по индексу
+    (author, -created_at). recipes - выборка рецептов с фильтрами
+    запроса, строки ленты сверяются с ней, только если фильтры есть.
+    Возвращает пары из выборки и полей её ключа.
+    """
+    feed_items = FeedItem.objects.filter(user=user)
+    if recipes.query.has_filters():
+        feed_items = feed_items.filter(recipe__in=recipes.values('pk'))
+    return [(feed_items, ('created_at', 'recipe_id'))] + [
+        (recipes.filter(author_id=author_id), ('created_at', 'id'))
+        for author_id in Subscription.objects.filter(
+            user=user, author__feed_pull__isnull=False
+        ).values_list('author_id', flat=True)
+    ]
+
+
+@transaction.atomic
+def rebuild_feeds():
+    """
+    Пересобирает все ленты по подпискам, например после массовой
+    загрузки данных, которая обходит сигналы. Сначала авторы
+    с FEED_PUSH_MAX_SUBSCRIBERS подписчиков и больше переводятся
+    в режим чтения, затем ленты заполняются одним INSERT ... SELECT
+    из подписок и последних FEED_BACKFILL_SIZE рецептов каждого автора.
+    """
+    FeedPullAuthor.objects.bulk_create(
+        [
+            FeedPullAuthor(author_id=author_id)
+            for author_id in Subscription.objects.values('author_id')
+            .annotate(subscribers=Count('pk'))
+            .filter(subscribers__gte=FEED_PUSH_MAX_SUBSCRIBERS)
+            .values_list('author_id', flat=True)
+        ],
+        ignore_conflicts=True
+    )
+    FeedItem.objects.all().delete()
+    quote = connection.ops.quote_name
+    feed_item, recipe, subscription, pull_author = (
+        quote(model._meta.db_table)
+        for model in (FeedItem, Recipe, Subscription, FeedPullAuthor)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH latest AS (
+                SELECT id, author_id, created_at FROM (
+                    SELECT id, author_id, created_at, row_number() OVER (
+                        PARTITION BY author_id
+                        ORDER BY created_at DESC, id DESC
+                    ) AS position
+                    FROM {recipe}
+                    WHERE author_id NOT IN (
+                        SELECT author_id FROM {pull_author}
+                    )
+                ) AS ranked
+                WHERE position <= %s
+            )
+            INSERT INTO {feed_item} (user_id, recipe_id, author_id, created_at)
+            SELECT subscription.user_id, latest.id, latest.author_id,
+                   latest.created_at
+            FROM {subscription} AS subscription
+            JOIN latest ON latest.author_id = subscription.author_id
+            """,
+            [FEED_BACKFILL_SIZE]
+        )
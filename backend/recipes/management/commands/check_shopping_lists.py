@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.shopping_lists import (find_drifted_shopping_lists,
+                                    rebuild_shopping_lists)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет сводные списки покупок с содержимым корзин '
+        'и при необходимости пересобирает разошедшиеся'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Пересобрать разошедшиеся списки покупок'
+        )
+
+    def handle(self, *args, **options):
+        drifted = find_drifted_shopping_lists()
+        if not drifted:
+            self.stdout.write(
+                self.style.SUCCESS('Списки покупок совпадают с корзинами.')
+            )
+            return
+        if not options['fix']:
+            raise CommandError(
+                f'Списки покупок разошлись у пользователей: {len(drifted)}. '
+                'Запустите команду с --fix.'
+            )
+        rebuild_shopping_lists(drifted)
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано списков покупок: {len(drifted)}.')
+        )
@@ -0,0 +1,233 @@
+import random
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.cache import RECIPES_VERSION, bump_data_version
+from recipes.constants import (COOKING_MAX_TIME, COOKING_MIN_TIME,
+                               INGREDIENT_MAX_AMOUNT, RECIPE_IMAGE_DIR)
+from recipes.counters import reconcile_counters
+from recipes.feeds import rebuild_feeds
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.shopping_lists import rebuild_shopping_lists
+from users.models import Subscription
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+PASSWORD = 'synthetic-password'
+USERNAME_PREFIX = 'synthetic'
+DEFAULT_TAGS = (
+    ('Завтрак', 'breakfast'), ('Обед', 'lunch'), ('Ужин', 'dinner')
+)
+# Прозрачный PNG 1x1, общий для всех сгенерированных рецептов.
+IMAGE_NAME = f'{RECIPE_IMAGE_DIR}synthetic.png'
+IMAGE_CONTENT = bytes.fromhex(
+    '89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489'
+    '0000000d4944415478da636460f85f0f0002870180eb47ba920000000049454e44'
+    'ae426082'
+)
+# Показатель степени в распределении Ципфа: чем больше, тем сильнее
+# популярность сосредоточена у первых авторов и рецептов.
+ZIPF_EXPONENT = 1.1
+# Форма распределения Парето для размеров избранного, корзин и подписок.
+PARETO_ALPHA = 1.5
+# Редкие элементы почти не выпадают при взвешенном выборе,
+# поэтому после нескольких попыток выборка добирается равномерно.
+WEIGHTED_SAMPLE_ROUNDS = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, рецептами, '
+        'избранным, корзинами и подписками для нагрузочных замеров'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=int, default=10,
+            help='Среднее количество рецептов в избранном пользователя'
+        )
+        parser.add_argument(
+            '--cart', type=int, default=3,
+            help='Среднее количество рецептов в корзине пользователя'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=5,
+            help='Среднее количество подписок пользователя'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = f'{USERNAME_PREFIX}{options["seed"]}_'
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(
+                f'Данные с seed={options["seed"]} уже сгенерированы.'
+            )
+        ingredient_ids = list(Ingredient.objects.values_list('pk', flat=True))
+        if not ingredient_ids:
+            raise CommandError('Сначала загрузите ингредиенты: load_data.')
+        tag_ids = self.get_tag_ids()
+        if not default_storage.exists(IMAGE_NAME):
+            default_storage.save(IMAGE_NAME, ContentFile(IMAGE_CONTENT))
+
+        user_ids = self.create_users(options['users'])
+        recipe_ids = self.create_recipes(
+            options['recipes'], user_ids, tag_ids, ingredient_ids
+        )
+        self.create_relations(
+            Favorite, user_ids, recipe_ids, options['favorites']
+        )
+        self.create_relations(
+            ShoppingCart, user_ids, recipe_ids, options['cart']
+        )
+        self.create_subscriptions(user_ids, options['subscriptions'])
+        # bulk_create не отправляет сигналы, обновляющие счётчики,
+        # сводные списки покупок и ленты подписок.
+        reconcile_counters()
+        rebuild_shopping_lists(user_ids)
+        rebuild_feeds()
+        bump_data_version(RECIPES_VERSION)
+        self.stdout.write(self.style.SUCCESS('Данные сгенерированы.'))
+
+    def bulk_insert(self, model, objects):
+        """Вставляет объекты пачками, не держа их все в памяти."""
+        objects = iter(objects)
+        total = 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
+
+    def zipf_weights(self, size):
+        """Накопленные веса: k-й по популярности выбирается в k^s раз реже."""
+        return list(accumulate(
+            1 / rank ** ZIPF_EXPONENT for rank in range(1, size + 1)
+        ))
+
+    def skewed_size(self, mean, limit):
+        """Размер с тяжёлым хвостом: у немногих очень большие значения."""
+        size = mean * (PARETO_ALPHA - 1) * self.random.paretovariate(
+            PARETO_ALPHA
+        )
+        return min(int(size), limit // 2)
+
+    def sample(self, population, cum_weights, size):
+        """Выборка без повторов с учётом популярности."""
+        chosen = set()
+        size = min(size, len(population))
+        for _ in range(WEIGHTED_SAMPLE_ROUNDS):
+            if len(chosen) >= size:
+                break
+            chosen.update(self.random.choices(
+                population, cum_weights=cum_weights, k=size - len(chosen)
+            ))
+        while len(chosen) < size:
+            chosen.add(self.random.choice(population))
+        return chosen
+
+    def get_tag_ids(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, slug=slug) for name, slug in DEFAULT_TAGS
+            )
+        return list(Tag.objects.values_list('pk', flat=True))
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        self.bulk_insert(User, (
+            User(
+                username=f'{self.prefix}{number}',
+                email=f'{self.prefix}{number}@example.com',
+                first_name='Синтетический',
+                last_name=f'Пользователь {number}',
+                password=password,
+            )
+            for number in range(count)
+        ))
+        return list(
+            User.objects.filter(username__startswith=self.prefix)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+    def create_recipes(self, count, user_ids, tag_ids, ingredient_ids):
+        author_weights = self.zipf_weights(len(user_ids))
+        ingredient_weights = self.zipf_weights(len(ingredient_ids))
+        recipe_ids = []
+        for start in range(0, count, self.batch_size):
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    author_id=self.random.choices(
+                        user_ids, cum_weights=author_weights
+                    )[0],
+                    name=f'Рецепт {number}',
+                    text=f'Описание синтетического рецепта {number}.',
+                    cooking_time=self.random.randint(
+                        COOKING_MIN_TIME, COOKING_MAX_TIME
+                    ),
+                    image=IMAGE_NAME,
+                )
+                for number in range(
+                    start, min(start + self.batch_size, count)
+                )
+            ])
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe in recipes
+                for tag_id in self.random.sample(
+                    tag_ids, self.random.randint(1, len(tag_ids))
+                )
+            ])
+            IngredientInRecipe.objects.bulk_create([
+                IngredientInRecipe(
+                    recipe_id=recipe.pk,
+                    ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, INGREDIENT_MAX_AMOUNT // 10)
+                )
+                for recipe in recipes
+                for ingredient_id in self.sample(
+                    ingredient_ids, ingredient_weights,
+                    self.random.randint(3, 12)
+                )
+            ])
+            recipe_ids.extend(recipe.pk for recipe in recipes)
+        self.stdout.write(f'{Recipe._meta.verbose_name_plural}: {count}')
+        return recipe_ids
+
+    def create_relations(self, model, user_ids, recipe_ids, mean):
+        """Избранное или корзина: популярные рецепты встречаются чаще."""
+        recipe_weights = self.zipf_weights(len(recipe_ids))
+        self.bulk_insert(model, (
+            model(author_id=user_id, recipe_id=recipe_id)
+            for user_id in user_ids
+            for recipe_id in self.sample(
+                recipe_ids, recipe_weights,
+                self.skewed_size(mean, len(recipe_ids))
+            )
+        ))
+
+    def create_subscriptions(self, user_ids, mean):
+        """Подписки тяготеют к популярным авторам."""
+        author_weights = self.zipf_weights(len(user_ids))
+        self.bulk_insert(Subscription, (
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in self.sample(
+                user_ids, author_weights,
+                self.skewed_size(mean, len(user_ids) - 1)
+            )
+            if author_id != user_id
+        ))
@@ -1,33 +1,153 @@
+import csv
 import json
 import os
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
+from recipes.cache import INGREDIENTS_VERSION, bump_data_version
+from recipes.constants import INGREDIENT_MAX_LENGTH, UNIT_MAX_LENGTH
 from recipes.models import Ingredient
 
 CONTAINER_FILE_PATH = '/app/ingredients.json'
+BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 64 * 1024
+FORMATS = ('csv', 'json')
+
+
+def iter_json_array(file, chunk_size=READ_CHUNK_SIZE):
+    """
+    Потоково разбирает JSON-массив, не загружая файл целиком.
+    Элементы разделяются запятыми, массив закрывается ']'.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    # Что ожидается дальше: начало массива, первый элемент или ']',
+    # элемент после запятой, запятая или ']' после элемента.
+    expected = 'array'
+    while True:
+        buffer = buffer.lstrip()
+        if buffer:
+            if expected == 'array':
+                if not buffer.startswith('['):
+                    raise json.JSONDecodeError('Ожидается массив', buffer, 0)
+                expected = 'first'
+                buffer = buffer[1:]
+                continue
+            if expected in ('first', 'separator') and buffer.startswith(']'):
+                return
+            if expected == 'separator':
+                if not buffer.startswith(','):
+                    raise json.JSONDecodeError(
+                        'Ожидается запятая или конец массива', buffer, 0
+                    )
+                expected = 'item'
+                buffer = buffer[1:]
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # Число в конце буфера может продолжиться в следующей части.
+                if end < len(buffer) or eof:
+                    yield item
+                    expected = 'separator'
+                    buffer = buffer[end:]
+                    continue
+        elif eof:
+            raise json.JSONDecodeError('Неожиданный конец файла', buffer, 0)
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def is_valid_row(name, measurement_unit):
+    return (
+        isinstance(name, str) and isinstance(measurement_unit, str)
+        and 0 < len(name.strip()) <= INGREDIENT_MAX_LENGTH
+        and 0 < len(measurement_unit.strip()) <= UNIT_MAX_LENGTH
+    )
+
+
+def read_json(file):
+    for item in iter_json_array(file):
+        if isinstance(item, dict):
+            yield item.get('name'), item.get('measurement_unit')
+        else:
+            yield None, None
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        yield tuple(row) if len(row) == 2 else (None, None)
 
 
 class Command(BaseCommand):
-    help = 'Загружает ингредиенты в базу данных из ingredients.json'
+    help = (
+        'Загружает ингредиенты в базу данных из CSV '
+        '(название, единица измерения) или JSON-файла'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=CONTAINER_FILE_PATH,
+            help=f'Путь к файлу, по умолчанию {CONTAINER_FILE_PATH}'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество строк в одной вставке'
+        )
 
-    def handle(self, *args, **kwargs):
-        file_path = CONTAINER_FILE_PATH
+    def handle(self, *args, **options):
+        file_path = options['path']
         if not os.path.exists(file_path):
-            self.stderr.write(self.style.ERROR(f'Файл {file_path} не найден!'))
-            return
+            raise CommandError(f'Файл {file_path} не найден!')
+        file_format = (
+            options['format']
+            or os.path.splitext(file_path)[1].lstrip('.').lower()
+        )
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Неизвестный формат файла {file_path}, укажите --format.'
+            )
+        reader = read_csv if file_format == 'csv' else read_json
+        total = invalid = 0
+        count_before = Ingredient.objects.count()
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                for item in data:
-                    Ingredient.objects.get_or_create(
-                        name=item['name'],
-                        measurement_unit=item['measurement_unit']
+            with open(file_path, 'r', encoding='utf-8', newline='') as file:
+                rows = reader(file)
+                while True:
+                    batch = list(islice(rows, options['batch_size']))
+                    if not batch:
+                        break
+                    total += len(batch)
+                    ingredients = [
+                        Ingredient(
+                            name=name.strip(),
+                            measurement_unit=measurement_unit.strip()
+                        )
+                        for name, measurement_unit in batch
+                        if is_valid_row(name, measurement_unit)
+                    ]
+                    invalid += len(batch) - len(ingredients)
+                    Ingredient.objects.bulk_create(
+                        ingredients, ignore_conflicts=True
                     )
-            self.stdout.write(
-                self.style.SUCCESS('Ингредиенты успешно загружены!')
-            )
         except json.JSONDecodeError:
-            self.stdout.write(
-                self.style.ERROR('Ошибка: Некорректный JSON-файл!')
-            )
+            raise CommandError('Ошибка: Некорректный JSON-файл!')
+        finally:
+            # bulk_create не отправляет сигналы.
+            bump_data_version(INGREDIENTS_VERSION)
+        inserted = Ingredient.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(
+            f'Ингредиенты загружены: добавлено {inserted}, '
+            f'пропущено {total - inserted} '
+            f'(из них некорректных {invalid}).'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Исправляет счётчики избранного и списков покупок у рецептов'
+
+    def handle(self, *args, **kwargs):
+        fixed = reconcile_counters()
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено рецептов: {fixed}.')
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from recipes.trending import update_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг популярных рецептов. '
+        'Запускается периодически, например из cron.'
+    )
+
+    def handle(self, *args, **kwargs):
+        updated = update_trending()
+        self.stdout.write(
+            self.style.SUCCESS(f'Рецептов с новой активностью: {updated}.')
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.17 on 2026-10-18 21:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.utils.timezone
+
+
+def fill_created_at(apps, schema_editor):
+    FeedItem = apps.get_model('recipes', 'FeedItem')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedItem.objects.update(created_at=Subquery(
+        Recipe.objects.filter(pk=OuterRef('recipe_id')).values('created_at')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_subscription_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feeditem',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Создано'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', '-created_at', '-recipe'], name='feeditem_user_created_idx'),
+        ),
+    ]
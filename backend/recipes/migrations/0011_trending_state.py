@@ -0,0 +1,37 @@
+# Generated by Django 4.2.17 on 2026-10-18 21:22
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def fill_state(apps, schema_editor):
+    # Прежние запуски учли события до последнего пересчёта.
+    TrendingRecipe = apps.get_model('recipes', 'TrendingRecipe')
+    TrendingState = apps.get_model('recipes', 'TrendingState')
+    last_run = TrendingRecipe.objects.aggregate(
+        last_run=Max('scored_at')
+    )['last_run']
+    if last_run is not None:
+        TrendingState.objects.create(pk=1, counted_until=last_run)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_feeditem_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counted_until', models.DateTimeField(verbose_name='События учтены до')),
+            ],
+            options={
+                'verbose_name': 'Состояние рейтинга',
+                'verbose_name_plural': 'Состояние рейтинга',
+            },
+        ),
+        migrations.RunPython(fill_state, migrations.RunPython.noop),
+    ]
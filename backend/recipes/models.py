@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
@@ -67,9 +69,40 @@ class Recipe(AuthorModel):
         ]
     )
     created_at = models.DateTimeField('Создано', auto_now_add=True)
+    # Счётчики обновляются сигналами, расхождения исправляет
+    # команда reconcile_counters.
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'В списках покупок', default=0, editable=False
+    )
+    # Заполняется триггером базы при изменении названия или описания.
+    search_vector = SearchVectorField(
+        'Поисковый вектор', null=True, editable=False
+    )
 
     class Meta:
-        ordering = ('-created_at',)
+        ordering = ('-created_at', '-id')
+        indexes = (
+            models.Index(
+                fields=('-created_at', '-id'), name='recipe_created_id_idx'
+            ),
+            # Рецепты автора без рассылки подмешиваются в ленту по нему.
+            models.Index(
+                fields=('author', '-created_at', '-id'),
+                name='recipe_author_created_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-created_at', '-id'),
+                name='recipe_popular_idx'
+            ),
+            GinIndex(fields=('search_vector',), name='recipe_search_idx'),
+            GinIndex(
+                fields=('name',), name='recipe_name_trgm_idx',
+                opclasses=('gin_trgm_ops',)
+            ),
+        )
         default_related_name = 'recipes'
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
@@ -133,3 +166,131 @@ class ShoppingCart(AuthorRecipeModel):
 
     def __str__(self):
         return f'{self.recipe.name} в корзине у {self.author.username}'
+
+
+class ShoppingListItem(models.Model):
+    """
+    Сводный список покупок пользователя.
+    Обновляется приращениями при изменении корзины
+    и ингредиентов рецептов в ней.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент'
+    )
+    total_amount = models.IntegerField('Количество')
+
+    class Meta:
+        unique_together = ('user', 'ingredient')
+        ordering = ('user', 'ingredient__name')
+        default_related_name = 'shopping_list'
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+
+    def __str__(self):
+        return f'{self.ingredient} - {self.total_amount}'
+
+
+class TrendingRecipe(models.Model):
+    """Рейтинг рецептов по недавней активности с затуханием."""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField('Рейтинг')
+    scored_at = models.DateTimeField('Пересчитан')
+
+    class Meta:
+        ordering = ('-score', '-recipe')
+        indexes = (
+            models.Index(
+                fields=('-score', '-recipe'), name='trending_score_idx'
+            ),
+        )
+        verbose_name = 'Популярный рецепт'
+        verbose_name_plural = 'Популярные рецепты'
+
+    def __str__(self):
+        return f'{self.recipe} - {self.score:.2f}'
+
+
+class TrendingState(models.Model):
+    """
+    Граница учтённых в рейтинге событий. Хранится отдельно от рейтинга,
+    чтобы не теряться при удалении всех затухших рецептов.
+    """
+    counted_until = models.DateTimeField('События учтены до')
+
+    class Meta:
+        verbose_name = 'Состояние рейтинга'
+        verbose_name_plural = 'Состояние рейтинга'
+
+    def __str__(self):
+        return f'{self.counted_until:%Y-%m-%d %H:%M}'
+
+
+class FeedItem(models.Model):
+    """Рецепт в ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Рецепт'
+    )
+    # Копия автора рецепта, чтобы отписка чистила ленту без JOIN.
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    # Копия даты рецепта: лента пользователя читается только
+    # по индексу, без обращения к таблице рецептов.
+    created_at = models.DateTimeField('Создано')
+
+    class Meta:
+        unique_together = ('user', 'recipe')
+        indexes = (
+            models.Index(
+                fields=('user', '-created_at', '-recipe'),
+                name='feeditem_user_created_idx'
+            ),
+        )
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self):
+        return f'{self.user} - {self.recipe}'
+
+
+class FeedPullAuthor(models.Model):
+    """
+    Автор с большим числом подписчиков. Его новые рецепты
+    не рассылаются по лентам, а подмешиваются при чтении.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='feed_pull',
+        verbose_name='Автор'
+    )
+    since = models.DateTimeField('С', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Автор без рассылки по лентам'
+        verbose_name_plural = 'Авторы без рассылки по лентам'
+
+    def __str__(self):
+        return str(self.author)
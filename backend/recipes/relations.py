@@ -0,0 +1,195 @@
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from users.models import Subscription
+
+from .cache import (POPULARITY_VERSION, bump_data_version,
+                    get_user_state_version_name)
+from .counters import change_counters
+from .events import publish_recipes_changed, publish_subscription_changed
+from .feeds import backfill_feed, prune_feed
+from .models import Recipe, ShoppingCart
+from .shopping_lists import (add_recipes_to_shopping_list,
+                             remove_recipes_from_shopping_list)
+
+
+def insert_ignoring_conflicts(model, rows, returning):
+    """
+    Один INSERT ... ON CONFLICT DO NOTHING RETURNING.
+    Возвращает значения поля returning только у вставленных строк,
+    поэтому одновременные повторы не приводят к ошибке.
+    """
+    if not rows:
+        return []
+    quote = connection.ops.quote_name
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    params = []
+    for row in rows:
+        instance = model(**row)
+        params.extend(
+            field.get_db_prep_save(
+                field.pre_save(instance, add=True), connection
+            )
+            for field in fields
+        )
+    placeholders = f'({", ".join(["%s"] * len(fields))})'
+    sql = (
+        f'INSERT INTO {quote(model._meta.db_table)} '
+        f'({", ".join(quote(field.column) for field in fields)}) '
+        f'VALUES {", ".join([placeholders] * len(rows))} '
+        'ON CONFLICT DO NOTHING '
+        f'RETURNING {quote(model._meta.get_field(returning).column)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [value for value, in cursor.fetchall()]
+
+
+def delete_returning(model, returning, **filters):
+    """
+    Один DELETE ... RETURNING по равенствам и спискам (__in).
+    Возвращает значения поля returning у удалённых строк.
+    """
+    quote = connection.ops.quote_name
+    conditions = []
+    params = []
+    for lookup, value in filters.items():
+        name, _, operator = lookup.partition('__')
+        column = quote(model._meta.get_field(name).column)
+        if operator == 'in':
+            value = list(value)
+            if not value:
+                return []
+            conditions.append(
+                f'{column} IN ({", ".join(["%s"] * len(value))})'
+            )
+            params.extend(value)
+        else:
+            conditions.append(f'{column} = %s')
+            params.append(value)
+    sql = (
+        f'DELETE FROM {quote(model._meta.db_table)} '
+        f'WHERE {" AND ".join(conditions)} '
+        f'RETURNING {quote(model._meta.get_field(returning).column)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [value for value, in cursor.fetchall()]
+
+
+def get_recipes_state(model, user, recipe_ids):
+    """
+    Одним запросом делит рецепты на уже связанные с пользователем,
+    ещё не связанные и несуществующие.
+    """
+    state = dict(
+        Recipe.objects.filter(pk__in=recipe_ids).annotate(
+            linked=Exists(
+                model.objects.filter(author=user, recipe=OuterRef('pk'))
+            )
+        ).values_list('pk', 'linked')
+    )
+    linked = [pk for pk, is_linked in state.items() if is_linked]
+    unlinked = [pk for pk, is_linked in state.items() if not is_linked]
+    missing = [pk for pk in dict.fromkeys(recipe_ids) if pk not in state]
+    return linked, unlinked, missing
+
+
+def recipes_linked(model, user_id, recipe_ids, delta):
+    """
+    Повторяет работу сигналов для массовых операций,
+    которые обходят save() и delete() моделей.
+    """
+    if not recipe_ids:
+        return
+    change_counters(model, recipe_ids, delta)
+    if model is ShoppingCart:
+        if delta > 0:
+            add_recipes_to_shopping_list(user_id, recipe_ids)
+        else:
+            remove_recipes_from_shopping_list(user_id, recipe_ids)
+    bump_data_version(get_user_state_version_name(user_id))
+    bump_data_version(POPULARITY_VERSION)
+    publish_recipes_changed(model, user_id, recipe_ids, delta > 0)
+
+
+@transaction.atomic
+def add_recipe(model, user, recipe_id):
+    """Добавляет рецепт в избранное или корзину, False если уже там."""
+    added = insert_ignoring_conflicts(
+        model, [{'author_id': user.pk, 'recipe_id': recipe_id}], 'recipe'
+    )
+    recipes_linked(model, user.pk, added, 1)
+    return bool(added)
+
+
+@transaction.atomic
+def remove_recipe(model, user, recipe_id):
+    """Удаляет рецепт из избранного или корзины, False если его там нет."""
+    removed = delete_returning(
+        model, 'recipe', author_id=user.pk, recipe_id=recipe_id
+    )
+    recipes_linked(model, user.pk, removed, -1)
+    return bool(removed)
+
+
+@transaction.atomic
+def bulk_add_recipes(model, user, recipe_ids):
+    """
+    Добавляет рецепты в избранное или корзину одним INSERT.
+    Возвращает добавленные, уже добавленные и несуществующие id.
+    """
+    existing, new, missing = get_recipes_state(model, user, recipe_ids)
+    added = insert_ignoring_conflicts(
+        model,
+        [{'author_id': user.pk, 'recipe_id': recipe_id} for recipe_id in new],
+        'recipe'
+    )
+    recipes_linked(model, user.pk, added, 1)
+    # Добавленные параллельным запросом тоже считаются уже добавленными.
+    existing.extend(set(new) - set(added))
+    return added, existing, missing
+
+
+@transaction.atomic
+def bulk_remove_recipes(model, user, recipe_ids):
+    """
+    Удаляет рецепты из избранного или корзины одним DELETE.
+    Возвращает удалённые, отсутствовавшие и несуществующие id.
+    """
+    linked, absent, missing = get_recipes_state(model, user, recipe_ids)
+    removed = delete_returning(
+        model, 'recipe', author_id=user.pk, recipe_id__in=linked
+    )
+    recipes_linked(model, user.pk, removed, -1)
+    absent.extend(set(linked) - set(removed))
+    return removed, absent, missing
+
+
+@transaction.atomic
+def subscribe(user, author):
+    """Подписывает пользователя на автора, False если уже подписан."""
+    added = insert_ignoring_conflicts(
+        Subscription, [{'user_id': user.pk, 'author_id': author.pk}], 'id'
+    )
+    if added:
+        backfill_feed(user.pk, author.pk)
+        bump_data_version(get_user_state_version_name(user.pk))
+        publish_subscription_changed(user.pk, author.pk, True)
+    return bool(added)
+
+
+@transaction.atomic
+def unsubscribe(user, author_id):
+    """Отписывает пользователя от автора, False если не был подписан."""
+    removed = delete_returning(
+        Subscription, 'id', user_id=user.pk, author_id=author_id
+    )
+    if removed:
+        prune_feed(user.pk, author_id)
+        bump_data_version(get_user_state_version_name(user.pk))
+        publish_subscription_changed(user.pk, int(author_id), False)
+    return bool(removed)
@@ -0,0 +1,131 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+
+from .models import IngredientInRecipe, ShoppingCart, ShoppingListItem
+
+
+def change_shopping_lists(user_ids, deltas):
+    """
+    Прибавляет к спискам покупок пользователей приращения
+    {ingredient_id: delta} и удаляет опустевшие позиции.
+    """
+    user_ids = list(user_ids)
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not user_ids or not deltas:
+        return
+    with transaction.atomic():
+        # Недостающие позиции создаются с нулём, чтобы приращение
+        # всегда сводилось к одному UPDATE с выражением F().
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, total_amount=0
+            )
+            for user_id in user_ids
+            for ingredient_id, delta in deltas.items() if delta > 0
+        ], ignore_conflicts=True)
+        items = ShoppingListItem.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=deltas
+        )
+        items.update(total_amount=F('total_amount') + Case(
+            *(
+                When(ingredient_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in deltas.items()
+            ),
+            default=Value(0)
+        ))
+        items.filter(total_amount__lte=0).delete()
+
+
+def get_recipes_amounts(recipe_ids, sign=1):
+    amounts = defaultdict(int)
+    for ingredient_id, amount in IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount'):
+        amounts[ingredient_id] += sign * amount
+    return amounts
+
+
+def add_recipes_to_shopping_list(user_id, recipe_ids):
+    change_shopping_lists([user_id], get_recipes_amounts(recipe_ids))
+
+
+def remove_recipes_from_shopping_list(user_id, recipe_ids):
+    change_shopping_lists([user_id], get_recipes_amounts(recipe_ids, -1))
+
+
+def change_recipe_in_shopping_lists(recipe_id, deltas):
+    """Переносит изменение ингредиентов рецепта во все корзины с ним."""
+    if not any(deltas.values()):
+        return
+    change_shopping_lists(
+        ShoppingCart.objects.filter(recipe_id=recipe_id)
+        .values_list('author_id', flat=True),
+        deltas
+    )
+
+
+def get_live_shopping_lists(user_ids=None):
+    """Списки покупок, посчитанные по корзинам: {user_id: {id: amount}}."""
+    carts = ShoppingCart.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(author_id__in=user_ids)
+    rows = carts.values_list(
+        'author_id', 'recipe__recipe_ingredients__ingredient_id'
+    ).annotate(
+        total_amount=Sum('recipe__recipe_ingredients__amount')
+    ).order_by()
+    lists = defaultdict(dict)
+    for user_id, ingredient_id, total_amount in rows.iterator():
+        # Рецепт без ингредиентов даёт строку с пустым ингредиентом.
+        if ingredient_id is not None:
+            lists[user_id][ingredient_id] = total_amount
+    return lists
+
+
+def get_stored_shopping_lists(user_ids=None):
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    lists = defaultdict(dict)
+    for user_id, ingredient_id, total_amount in items.values_list(
+        'user_id', 'ingredient_id', 'total_amount'
+    ).order_by().iterator():
+        lists[user_id][ingredient_id] = total_amount
+    return lists
+
+
+def find_drifted_shopping_lists():
+    """Пользователи, чей сводный список разошёлся с корзиной."""
+    live = get_live_shopping_lists()
+    stored = get_stored_shopping_lists()
+    return sorted(
+        user_id for user_id in live.keys() | stored.keys()
+        if live.get(user_id) != stored.get(user_id)
+    )
+
+
+@transaction.atomic
+def rebuild_shopping_lists(user_ids=None):
+    """Пересобирает сводные списки по корзинам, всем или указанным."""
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        items = items.filter(user_id__in=user_ids)
+    items.delete()
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total_amount
+            )
+            for user_id, amounts in get_live_shopping_lists(user_ids).items()
+            for ingredient_id, total_amount in amounts.items()
+        ),
+        batch_size=5000
+    )
@@ -0,0 +1,178 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from users.models import Subscription
+
+from .cache import (INGREDIENTS_VERSION, POPULARITY_VERSION, RECIPES_VERSION,
+                    TAGS_VERSION, bump_data_version,
+                    get_user_state_version_name, invalidate_recipe_fragments)
+from .counters import change_counter
+from .events import (publish_recipe_created, publish_recipes_changed,
+                     publish_subscription_changed)
+from .feeds import backfill_feed, prune_feed, push_recipe_on_commit
+from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                     ShoppingCart, Tag)
+from .shopping_lists import (add_recipes_to_shopping_list,
+                             change_recipe_in_shopping_lists,
+                             remove_recipes_from_shopping_list)
+
+User = get_user_model()
+
+
+def invalidate_recipes(recipe_ids):
+    """Сбрасывает фрагменты рецептов и версию списка рецептов."""
+    invalidate_recipe_fragments(recipe_ids)
+    bump_data_version(RECIPES_VERSION)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def push_recipe_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        push_recipe_on_commit(instance)
+        publish_recipe_created(instance)
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def invalidate_recipe_ingredient(sender, instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_recipes([instance.pk])
+    elif pk_set:
+        invalidate_recipes(pk_set)
+    else:
+        invalidate_recipes(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tag(sender, instance, created=False, **kwargs):
+    # Связи с рецептами удаляются без m2m_changed,
+    # поэтому при удалении рецепты собираются заранее.
+    bump_data_version(TAGS_VERSION)
+    if not created:
+        invalidate_recipes(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient(sender, instance, created=False, **kwargs):
+    bump_data_version(INGREDIENTS_VERSION)
+    if not created:
+        invalidate_recipes(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, created, update_fields, **kwargs):
+    # Обновление last_login при входе не меняет профиль автора.
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    invalidate_recipes(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_user_recipes_state(sender, instance, **kwargs):
+    bump_data_version(get_user_state_version_name(instance.author_id))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        change_counter(sender, instance.recipe_id, 1)
+        bump_data_version(POPULARITY_VERSION)
+        publish_recipes_changed(
+            sender, instance.author_id, [instance.recipe_id], True
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    change_counter(sender, instance.recipe_id, -1)
+    bump_data_version(POPULARITY_VERSION)
+    publish_recipes_changed(
+        sender, instance.author_id, [instance.recipe_id], False
+    )
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_user_subscriptions_state(sender, instance, **kwargs):
+    bump_data_version(get_user_state_version_name(instance.user_id))
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_subscriber_feed(sender, instance, created, **kwargs):
+    if created:
+        backfill_feed(instance.user_id, instance.author_id)
+        publish_subscription_changed(
+            instance.user_id, instance.author_id, True
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def prune_subscriber_feed(sender, instance, **kwargs):
+    prune_feed(instance.user_id, instance.author_id)
+    publish_subscription_changed(instance.user_id, instance.author_id, False)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        add_recipes_to_shopping_list(instance.author_id, [instance.recipe_id])
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    remove_recipes_from_shopping_list(
+        instance.author_id, [instance.recipe_id]
+    )
+
+
+@receiver(pre_save, sender=IngredientInRecipe)
+def remember_recipe_ingredient(sender, instance, **kwargs):
+    # Прежнее количество нужно, чтобы перенести в списки покупок разницу.
+    instance._previous = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list('ingredient_id', 'amount').first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def update_shopping_lists_amount(sender, instance, **kwargs):
+    deltas = defaultdict(int)
+    deltas[instance.ingredient_id] += instance.amount
+    previous = getattr(instance, '_previous', None)
+    if previous:
+        ingredient_id, amount = previous
+        deltas[ingredient_id] -= amount
+    change_recipe_in_shopping_lists(instance.recipe_id, deltas)
+
+
+@receiver(post_delete, sender=IngredientInRecipe)
+def remove_shopping_lists_amount(sender, instance, **kwargs):
+    change_recipe_in_shopping_lists(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import UrlMap
+from .models import LinkClicks, UrlMap
 
 
 @admin.register(UrlMap)
@@ -9,3 +9,9 @@ class UrlMapAdmin(admin.ModelAdmin):
     search_fields = ('short_code', 'short_url', 'full_url', 'recipe__name')
     list_filter = ('recipe',)
     ordering = ('recipe',)
+
+
+@admin.register(LinkClicks)
+class LinkClicksAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'clicks')
+    search_fields = ('recipe__name',)
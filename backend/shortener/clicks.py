@@ -0,0 +1,95 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.db.models import Case, F, Value, When
+
+from recipes.models import Recipe
+
+from .models import LinkClicks
+
+logger = logging.getLogger(__name__)
+
+# Счётчики сбрасываются в базу по объёму или по времени.
+CLICKS_FLUSH_SIZE = 100
+CLICKS_FLUSH_INTERVAL = 60
+
+
+class ClickBuffer:
+    """
+    Буфер переходов по коротким ссылкам в памяти процесса.
+    Накопленные переходы записываются в базу пачкой,
+    а не отдельным запросом на каждый редирект.
+    """
+
+    def __init__(self, flush_size=CLICKS_FLUSH_SIZE,
+                 flush_interval=CLICKS_FLUSH_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._clicks = Counter()
+        self._total = 0
+        self._flushed_at = time.monotonic()
+
+    def add(self, recipe_id):
+        with self._lock:
+            self._clicks[recipe_id] += 1
+            self._total += 1
+            if not (
+                self._total >= self.flush_size
+                or time.monotonic() - self._flushed_at >= self.flush_interval
+            ):
+                return
+            clicks = self._take()
+        self._safe_write(clicks)
+
+    def flush(self):
+        with self._lock:
+            clicks = self._take()
+        self._safe_write(clicks)
+
+    def _safe_write(self, clicks):
+        """
+        Ошибка записи не должна ломать редирект пользователя.
+        Переходы возвращаются в буфер и уйдут со следующей записью.
+        """
+        try:
+            self._write(clicks)
+        except Exception:
+            logger.exception('Failed to flush link clicks')
+            with self._lock:
+                self._clicks.update(clicks)
+
+    def _take(self):
+        clicks = self._clicks
+        self._clicks = Counter()
+        self._total = 0
+        self._flushed_at = time.monotonic()
+        return clicks
+
+    @staticmethod
+    def _write(clicks):
+        if not clicks:
+            return
+        # Код мог указывать на несуществующий или удалённый рецепт.
+        recipe_ids = list(
+            Recipe.objects.filter(pk__in=clicks).values_list('pk', flat=True)
+        )
+        if not recipe_ids:
+            return
+        LinkClicks.objects.bulk_create(
+            [LinkClicks(recipe_id=recipe_id) for recipe_id in recipe_ids],
+            ignore_conflicts=True
+        )
+        LinkClicks.objects.filter(recipe_id__in=recipe_ids).update(
+            clicks=F('clicks') + Case(*(
+                When(recipe_id=recipe_id, then=Value(clicks[recipe_id]))
+                for recipe_id in recipe_ids
+            ))
+        )
+
+
+click_buffer = ClickBuffer()
+atexit.register(click_buffer.flush)
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.17 on 2026-10-18 20:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_created_id_idx'),
+        ('shortener', '0003_alter_urlmap_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkClicks',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='recipes.recipe')),
+                ('clicks', models.PositiveBigIntegerField(default=0, verbose_name='Переходы')),
+            ],
+            options={
+                'verbose_name': 'Переходы по ссылке',
+                'verbose_name_plural': 'Переходы по ссылкам',
+                'ordering': ('-clicks',),
+            },
+        ),
+    ]
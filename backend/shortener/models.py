@@ -23,3 +23,18 @@ class UrlMap(models.Model):
 
     def __str__(self):
         return '{} - {}'.format(self.recipe, self.short_url)
+
+
+class LinkClicks(models.Model):
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True
+    )
+    clicks = models.PositiveBigIntegerField('Переходы', default=0)
+
+    class Meta:
+        ordering = ('-clicks',)
+        verbose_name = 'Переходы по ссылке'
+        verbose_name_plural = 'Переходы по ссылкам'
+
+    def __str__(self):
+        return '{} - {}'.format(self.recipe, self.clicks)
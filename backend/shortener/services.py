@@ -1,19 +1,53 @@
-import random
-
-from .models import UrlMap
-
 # Убраны схожие символы: l, I, 1.
 DICTIONARY = 'ABCDEFGHJKLMNOPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz234567890'
-# Рекомендуемая длина от 2 до 10.
-DEFAULT_CODE_LENGTH = 3
+BASE = len(DICTIONARY)
+DIGITS = {char: digit for digit, char in enumerate(DICTIONARY)}
+# Трёхсимвольные коды остались от случайной генерации и ищутся в UrlMap.
+MIN_CODE_LENGTH = 4
+# Достаточно для любого значения BigAutoField.
+MAX_CODE_LENGTH = 11
+# Множитель взаимно прост с BASE, поэтому перестановка обратима.
+CODE_MULTIPLIER = 0x5DEECE66D
+CODE_OFFSET = 0xB
+
 
+def get_code_length(recipe_id):
+    """Длина кода: минимальная, в которую помещается id рецепта."""
+    length = MIN_CODE_LENGTH
+    while recipe_id >= BASE ** length:
+        length += 1
+    return length
 
-def generate_unique_code(length=DEFAULT_CODE_LENGTH):
+
+def encode_recipe_id(recipe_id):
     """
-    Генерирует уникальный короткий код фиксированной длины.
-    При коллизии повторяет попытку.
+    Короткий код рецепта.
+    id переставляется внутри пространства кодов своей длины,
+    чтобы соседние рецепты не получали похожие коды.
     """
-    while True:
-        code = ''.join(random.choice(DICTIONARY) for _ in range(length))
-        if not UrlMap.objects.filter(short_code=code).exists():
-            return code
+    length = get_code_length(recipe_id)
+    value = (recipe_id * CODE_MULTIPLIER + CODE_OFFSET) % BASE ** length
+    code = []
+    for _ in range(length):
+        value, digit = divmod(value, BASE)
+        code.append(DICTIONARY[digit])
+    return ''.join(code)
+
+
+def decode_short_code(short_code):
+    """Возвращает id рецепта по короткому коду или None."""
+    length = len(short_code)
+    if not MIN_CODE_LENGTH <= length <= MAX_CODE_LENGTH:
+        return None
+    value = 0
+    for char in reversed(short_code):
+        if char not in DIGITS:
+            return None
+        value = value * BASE + DIGITS[char]
+    space = BASE ** length
+    recipe_id = (
+        (value - CODE_OFFSET) * pow(CODE_MULTIPLIER, -1, space) % space
+    )
+    if not recipe_id or get_code_length(recipe_id) != length:
+        return None
+    return recipe_id
@@ -1,9 +1,49 @@
-from django.shortcuts import get_object_or_404, redirect
+from functools import lru_cache
 
+from django.http import Http404
+from django.shortcuts import redirect
+from django.utils.cache import patch_cache_control
+
+from .clicks import click_buffer
 from .models import UrlMap
+from .services import decode_short_code
+
+RECIPE_URL = '/recipes/{}/'
+SHORT_CODES_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=SHORT_CODES_CACHE_SIZE)
+def find_url_map(short_code):
+    """
+    Пара (id рецепта, полный URL) старой ссылки из таблицы.
+    Отсутствие кода сообщается исключением: lru_cache их не кэширует,
+    поэтому код, созданный позже, находится без перезапуска.
+    """
+    return tuple(UrlMap.objects.values_list('recipe_id', 'full_url').get(
+        short_code=short_code
+    ))
+
+
+def resolve_short_code(short_code):
+    """Возвращает пару (id рецепта, полный URL) или None."""
+    recipe_id = decode_short_code(short_code)
+    if recipe_id is not None:
+        return recipe_id, RECIPE_URL.format(recipe_id)
+    try:
+        return find_url_map(short_code)
+    except UrlMap.DoesNotExist:
+        return None
 
 
 def redirect_to_full_url(request, short_code):
     """Редирект пользователя на полный URL по короткому коду."""
-    url_map = get_object_or_404(UrlMap, short_code=short_code)
-    return redirect(url_map.full_url)
+    resolved = resolve_short_code(short_code)
+    if resolved is None:
+        raise Http404('Короткая ссылка не найдена.')
+    recipe_id, full_url = resolved
+    click_buffer.add(recipe_id)
+    response = redirect(full_url)
+    # Повторный переход из кэша браузера или прокси не дошёл бы
+    # до счётчика переходов.
+    patch_cache_control(response, private=True, no_store=True)
+    return response